@@ -0,0 +1,255 @@
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from session_file import SessionReader
+
+# Offline analytics over recorded sessions (.hsr files, see session_file.py).
+# Every game event of every session is loaded into one set of columns (EventTable),
+# and the metrics are computed on the columns as a whole with NumPy, so
+# summaries over tens of thousands of sessions need no Python loop per event.
+#
+# A "play" is one game run: the events from a "start" event to the next one
+# in the same session file (the game host can play several games per file).
+
+# Event kinds stored as codes in the kind column
+KINDS = ("start", "end", "score", "stimulus", "response", "opened", "closed", "held")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+START = KIND_CODES["start"]
+
+
+# Columns of all events, one row per event, ordered by session then time:
+#   session, kind, play   int32 (play is -1 before a session's first start)
+#   timestamp             float64 capture time
+#   hand                  int16, -1 when the event is not about one hand
+#   value, duration       float64, NaN when absent or not a number
+#   correct               int8, 1/0 for responses, -1 otherwise
+# Plays have their own columns: session, game and player codes, start and end time.
+class EventTable:
+    def __init__(self, columns, plays, games, players, paths):
+        self.__dict__.update(columns)
+        self.plays = plays
+        self.games = games
+        self.players = players
+        self.paths = paths
+
+    def __len__(self):
+        return len(self.kind)
+
+    def mask(self, kind):
+        return self.kind == KIND_CODES[kind]
+
+
+NUMBER_TYPES = (int, float)  # Not bool: True is no value
+
+
+# Event columns of some session files (as lists, see EventTable) and the
+# (game, player) of each start event. Runs in the worker processes when there are many files.
+def read_events(paths, first_session=0):
+    columns = {name: [] for name in ("session", "kind", "timestamp", "hand", "value", "duration", "correct")}
+    add_session, add_kind, add_timestamp, add_hand, add_value, add_duration, add_correct = (
+        column.append for column in columns.values())
+    start_names = []
+    nan = float("nan")
+    for session_idx, path in enumerate(paths, first_session):
+        try:
+            reader = SessionReader(path)
+        except (OSError, ValueError) as error:
+            print(f"Skipping {path}: {error}")
+            continue
+        for _, timestamp, kind, data in reader.events():
+            code = KIND_CODES.get(kind)
+            if code is None:
+                continue
+            get = (data or {}).get
+            hand, value, duration, correct = get("hand"), get("value", get("score")), get("duration"), get("correct")
+            add_session(session_idx)
+            add_kind(code)
+            add_timestamp(timestamp)
+            add_hand(-1 if hand is None else hand)
+            add_value(value if type(value) in NUMBER_TYPES else nan)
+            add_duration(duration if type(duration) in NUMBER_TYPES else nan)
+            add_correct(-1 if correct is None else int(correct))
+            if code == START:
+                start_names.append((get("game") or "", get("player") or ""))
+        reader.close()
+    return columns, start_names
+
+
+# Load the events of many session files into one EventTable. The files are
+# read by worker processes when there are enough of them to be worth it.
+def load_sessions(paths, workers=None):
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(paths) >= 1000:
+        batch = -(-len(paths) // (workers * 4))
+        firsts = range(0, len(paths), batch)
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(read_events, [paths[first:first + batch] for first in firsts], firsts))
+    else:
+        parts = [read_events(paths)]
+    start_names = [names for _, part_names in parts for names in part_names]
+
+    dtypes = {"session": np.int32, "kind": np.int8, "timestamp": np.float64, "hand": np.int16,
+              "value": np.float64, "duration": np.float64, "correct": np.int8}
+    columns = {name: np.concatenate([np.array(part[name], dtype=dtype) for part, _ in parts])
+               for name, dtype in dtypes.items()}
+    # Events of a session in time order (music changes can be recorded late, from their own thread)
+    order = np.lexsort((columns["timestamp"], columns["session"]))
+    start_rank = np.cumsum(columns["kind"] == START) - 1  # Index into start_names
+    for name in columns:
+        columns[name] = columns[name][order]
+    is_start = columns["kind"] == START
+    names = [start_names[idx] for idx in start_rank[order[is_start]]]
+    games, game_codes = np.unique(np.array([game for game, _ in names], dtype=str), return_inverse=True)
+    players, player_codes = np.unique(np.array([player for _, player in names], dtype=str), return_inverse=True)
+
+    # Each event belongs to the latest start before it in the same session
+    play = np.cumsum(is_start) - 1
+    start_idx = np.flatnonzero(is_start)
+    if len(start_idx):
+        same_session = columns["session"] == columns["session"][start_idx[np.maximum(play, 0)]]
+        play = np.where((play >= 0) & same_session, play, -1)
+    columns["play"] = play.astype(np.int32)
+
+    # A play ends with its "end" event, or with its last event if the game never got there
+    play_count = len(start_idx)
+    in_play = play >= 0
+    end_time = np.full(play_count, -np.inf)
+    np.maximum.at(end_time, play[in_play], columns["timestamp"][in_play])
+    plays = {
+        "session": columns["session"][start_idx],
+        "game": game_codes.astype(np.int32),
+        "player": player_codes.astype(np.int32),
+        "start": columns["timestamp"][start_idx],
+        "end": end_time,
+    }
+    return EventTable(columns, plays, list(games), list(players), list(paths))
+
+
+# Time from each stimulus to the first response after it in the same play.
+# For answers confirmed by holding them, the hold time is not part of the
+# reaction: the response counts from when the held value first showed.
+# Returns (play, reaction seconds, correct) for every answered stimulus.
+def reaction_times(table):
+    row = np.arange(len(table))
+    is_stimulus = table.mask("stimulus")
+    is_response = table.mask("response")
+    last_stimulus = np.maximum.accumulate(np.where(is_stimulus, row, -1))
+    last_response = np.maximum.accumulate(np.where(is_response, row, -1))
+    previous_response = np.concatenate(([-1], last_response[:-1]))
+
+    first = is_response & (last_stimulus >= 0) & (previous_response < last_stimulus)
+    responses = np.flatnonzero(first)
+    stimuli = last_stimulus[responses]
+    same_play = (table.play[responses] == table.play[stimuli]) & (table.play[responses] >= 0)
+    responses, stimuli = responses[same_play], stimuli[same_play]
+
+    held_for = np.nan_to_num(table.duration[responses])
+    reaction = np.maximum(table.timestamp[responses] - held_for - table.timestamp[stimuli], 0.0)
+    return table.play[responses], reaction, table.correct[responses]
+
+
+# Per-play metrics, one array entry per play (NaN where a game has no such events)
+def play_metrics(table):
+    play_count = len(table.plays["start"])
+    in_play = table.play >= 0
+    play = table.play[in_play]
+
+    def count(mask):
+        return np.bincount(play[mask[in_play]], minlength=play_count).astype(np.float64)
+
+    def mean(mask, values):
+        total = np.bincount(play[mask[in_play]], weights=values[in_play][mask[in_play]], minlength=play_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return total / count(mask)
+
+    seconds = table.plays["end"] - table.plays["start"]
+    responses = count(table.mask("response"))
+    wrong = count(table.mask("response") & (table.correct == 0))
+    held = table.mask("held")
+    reaction_play, reaction, _ = reaction_times(table)
+    reaction_total = np.bincount(reaction_play, weights=reaction, minlength=play_count)
+    reaction_count = np.bincount(reaction_play, minlength=play_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "seconds": seconds,
+            # Only for games that follow open/close gestures
+            "closures_per_second": np.where((seconds > 0) & (count(table.mask("opened")) > 0),
+                                            count(table.mask("closed")) / seconds, np.nan),
+            "responses": responses,
+            "error_rate": wrong / responses,
+            "reaction_time": reaction_total / reaction_count,
+            "hold_duration": mean(held, np.nan_to_num(table.duration)),
+        }
+
+
+# Group summary of the per-play metrics by game or player: plays, and the mean
+# and median of each metric over the plays that have it
+def summarize(table, by="game"):
+    names = table.games if by == "game" else table.players
+    groups = table.plays[by]
+    metrics = play_metrics(table)
+    summary = {"name": names, "plays": np.bincount(groups, minlength=len(names))}
+    for metric, values in metrics.items():
+        valid = ~np.isnan(values)
+        group, values = groups[valid], values[valid]
+        counts = np.bincount(group, minlength=len(names))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            summary[f"{metric}_mean"] = np.bincount(group, weights=values, minlength=len(names)) / counts
+        summary[f"{metric}_median"] = group_medians(group, values, counts)
+    return summary
+
+
+# Median of values per group code, with one sort instead of a loop over the groups
+def group_medians(group, values, counts):
+    medians = np.full(len(counts), np.nan)
+    if not len(values):
+        return medians
+    order = np.lexsort((values, group))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has = counts > 0
+    low = starts[has] + (counts[has] - 1) // 2
+    high = starts[has] + counts[has] // 2
+    medians[has] = (sorted_values[low] + sorted_values[high]) / 2
+    return medians
+
+
+def print_summary(summary, by):
+    metrics = ("reaction_time", "error_rate", "closures_per_second", "hold_duration")
+    headers = [by, "plays"] + [f"{metric} (mean/median)" for metric in metrics]
+    rows = []
+    for idx, name in enumerate(summary["name"]):
+        row = [name or "?", str(summary["plays"][idx])]
+        for metric in metrics:
+            mean, median = summary[f"{metric}_mean"][idx], summary[f"{metric}_median"][idx]
+            row.append("-" if np.isnan(mean) else f"{mean:.3f} / {median:.3f}")
+        rows.append(row)
+    widths = [max(len(row[col]) for row in rows + [headers]) for col in range(len(headers))]
+    for row in [headers] + rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reaction times, closure rates and accuracy from recorded sessions")
+    parser.add_argument("sessions", nargs="+", help=".hsr session files or folders of them")
+    parser.add_argument("--by", choices=("game", "player"), default="game", help="group the summary by")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.sessions:
+        if os.path.isdir(path):
+            paths.extend(sorted(glob.glob(os.path.join(path, "**", "*.hsr"), recursive=True)))
+        else:
+            paths.append(path)
+    table = load_sessions(paths)
+    print(f"{len(paths)} sessions, {len(table.plays['start'])} plays, {len(table)} events")
+    print_summary(summarize(table, args.by), args.by)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import argparse
+import multiprocessing
+import os
+import queue
+
+from frame_ring import FrameRing
+from replay import record_from_results, results_from_record
+
+# How long a station waits for an answer before it goes on without hands
+WORKER_TIMEOUT = 10
+
+
+# Pin the calling process to one core where the OS allows it
+def pin_to_core(core):
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {core})
+        except OSError:
+            pass
+
+
+# Inference worker process. Every worker takes requests from the one shared
+# queue, so a station with costly frames never holds up the stations behind it:
+# whichever worker is free runs the next frame. A worker keeps one Mediapipe
+# graph per (station, hand count) it has seen and answers every request on the
+# result queue of the station that sent it. A station's frames may be spread
+# over several graphs; each still tracks from the last frame it saw and detects
+# the hands again when they moved too far. Frames are read in place from the
+# station's FrameRing; only the sequence number and the landmarks go through the queues.
+def inference_worker(core, requests, results):
+    pin_to_core(core)
+    detectors = {}
+    rings = {}
+    try:
+        while True:
+            item = requests.get()
+            if item is None:
+                break
+            station_id, ring_name, seq, max_num_hands, min_detection_confidence = item
+            # The station always gets an answer, or it would wait for this frame
+            try:
+                hands = detect(detectors, rings, station_id, ring_name, seq, max_num_hands, min_detection_confidence)
+            except Exception as error:
+                print(f"Inference worker on core {core}: frame {seq} of station {station_id} failed: {error}")
+                hands = []
+            results[station_id].put((seq, hands))
+    finally:
+        for detector in detectors.values():
+            detector.close()
+        for ring in rings.values():
+            ring.close()
+
+
+# Hands found in frame seq of a station's ring, as recorded landmarks
+def detect(detectors, rings, station_id, ring_name, seq, max_num_hands, min_detection_confidence):
+    from hand_engine import mp_hands
+
+    # Attach to the station's ring (again if it grew)
+    ring = rings.get(station_id)
+    if ring is None or ring.name != ring_name:
+        if ring is not None:
+            ring.close()
+            del rings[station_id]
+        ring = rings[station_id] = FrameRing(ring_name)
+    frame_rgb, timestamp = ring.read(seq)
+    if frame_rgb is None:
+        return []
+
+    key = (station_id, max_num_hands)
+    if key not in detectors:
+        detectors[key] = mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=min_detection_confidence,
+        )
+    hand_results = detectors[key].process(frame_rgb)
+    return record_from_results(hand_results, timestamp, frame_rgb.shape)["hands"]
+
+
+# Station side of the pool: the shared request queue, the station's own
+# result queue and the shared-memory ring its frames go through
+class StationLink:
+    def __init__(self, station_id, requests, results):
+        self.station_id = station_id
+        self.requests = requests
+        self.results = results
+        self.ring = None
+
+    # Detector factory for HandEngine
+    def make_detector(self, max_num_hands, min_detection_confidence):
+        return RemoteDetector(self, max_num_hands, min_detection_confidence)
+
+    # Put a frame and its capture time in the ring, made on the first frame and
+    # again whenever a bigger one comes (a crop can be taller than the
+    # downscaled full frame). Returns its sequence number.
+    def share(self, frame_rgb, timestamp=0.0):
+        if self.ring is None or not self.ring.fits(frame_rgb.shape):
+            last_seq = 0
+            if self.ring is not None:
+                last_seq = self.ring.last_seq
+                self.ring.close()
+            self.ring = FrameRing.for_shape(frame_rgb.shape)
+            self.ring.last_seq = last_seq
+        return self.ring.write(frame_rgb, timestamp)
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+# Stands in for mp_hands.Hands inside a station: process() puts the frame in the
+# station's ring, tells the workers its sequence number and waits for the landmarks.
+# Each station has at most one frame in flight, so a slow station only ever delays
+# itself and no worker ever reads a slot that is being rewritten.
+# When no answer comes within WORKER_TIMEOUT the station goes on without hands:
+# until the late answer arrives it sends no more frames (its frame stays in the
+# ring for the worker) and every frame returns at once with no hands found.
+class RemoteDetector:
+    # process() takes the frame's capture time (see process_frame)
+    timestamped = True
+
+    def __init__(self, link, max_num_hands, min_detection_confidence):
+        self.link = link
+        self.max_num_hands = max_num_hands
+        self.min_detection_confidence = min_detection_confidence
+        self.pending = None  # Sequence number of the frame in flight
+
+    # Hands of the frame in flight, waiting up to timeout seconds (0: only
+    # look), or None when they haven't come; answers to earlier frames are skipped
+    def collect(self, timeout):
+        while True:
+            try:
+                if timeout:
+                    answer_seq, hands = self.link.results.get(timeout=timeout)
+                else:
+                    answer_seq, hands = self.link.results.get_nowait()
+            except queue.Empty:
+                return None
+            if answer_seq == self.pending:
+                self.pending = None
+                return hands
+
+    def process(self, frame_rgb, timestamp=0.0):
+        link = self.link
+        if self.pending is not None:
+            # Still stalled; the late answer is for an old frame, so only its arrival counts
+            if self.collect(0) is None:
+                return results_from_record({"hands": []})
+            print(f"Station {link.station_id}: inference workers answering again")
+
+        self.pending = link.share(frame_rgb, timestamp)
+        link.requests.put((link.station_id, link.ring.name, self.pending, self.max_num_hands,
+                           self.min_detection_confidence))
+        hands = self.collect(WORKER_TIMEOUT)
+        if hands is None:
+            print(f"Station {link.station_id}: no answer from the inference workers in {WORKER_TIMEOUT} s, "
+                  f"going on without hands until they answer")
+            return results_from_record({"hands": []})
+        return results_from_record({"hands": hands})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+# One station: its own camera (or replay), game and window; only the hand
+# detection runs in the shared worker pool
+def run_station(station_id, source, game_name, link, game_args):
+    from game_host import GAMES
+    from game_io import open_game_io
+
+    game_class = GAMES[game_name]
+    source_args = ["--camera", source] if source.isdigit() else ["--replay", source]
+    engine, display, clock = open_game_io(game_class.max_num_hands, game_class.flip, source_args + game_args,
+                                          game_class.flow_tracking, link.make_detector,
+                                          camera_needs=game_class.camera_needs)
+
+    # Check if camera opened successfully
+    if not engine.is_opened():
+        print(f"Station {station_id}: unable to open {source}")
+        return
+
+    try:
+        with engine:
+            game = game_class(engine, display, clock)
+            game.window_name = f"{game.window_name} - Station {station_id + 1}"
+            game.run()
+    finally:
+        link.close()
+
+    # Close all windows
+    display.close()
+
+
+# Parse "SOURCE:GAME" (SOURCE is a camera index or a video/landmark file)
+def parse_station(spec):
+    source, _, game_name = spec.rpartition(":")
+    if not source or not game_name:
+        raise argparse.ArgumentTypeError(f"expected SOURCE:GAME, got {spec!r}")
+    return source, game_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several stations from one machine with a shared detector pool")
+    parser.add_argument("--station", action="append", type=parse_station, required=True, metavar="SOURCE:GAME",
+                        help="camera index or replay file and the game to play on it (repeat for each station)")
+    parser.add_argument("--workers", type=int, help="inference worker processes (default: one per station, up to the cores)")
+    args, game_args = parser.parse_known_args()
+
+    # Other options (--headless, --seed, --max-frames...) are passed on to every station's game
+    from game_host import GAMES
+    for source, game_name in args.station:
+        if game_name not in GAMES:
+            parser.error(f"unknown game {game_name!r} (choose from {', '.join(sorted(GAMES))})")
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or min(len(args.station), cores)
+
+    # Spawned processes behave the same on Windows and Linux
+    context = multiprocessing.get_context("spawn")
+    requests = context.Queue()
+    results = [context.Queue() for _ in args.station]
+
+    worker_processes = [
+        context.Process(target=inference_worker, args=(worker_idx % cores, requests, results), daemon=True)
+        for worker_idx in range(workers)
+    ]
+    for process in worker_processes:
+        process.start()
+
+    station_processes = []
+    for station_id, (source, game_name) in enumerate(args.station):
+        link = StationLink(station_id, requests, results[station_id])
+        process = context.Process(target=run_station, args=(station_id, source, game_name, link, game_args))
+        process.start()
+        station_processes.append(process)
+
+    for process in station_processes:
+        process.join()
+    for _ in worker_processes:
+        requests.put(None)
+    for process in worker_processes:
+        process.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import argparse
+import contextlib
+import ctypes
+import glob
+import io
+import json
+import os
+import platform
+import runpy
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+import cv2
+import numpy as np
+
+import game_io
+import hud
+from skeleton import SkeletonRenderer
+from stage_timer import StageTimer
+
+# Game scripts covered by the benchmark
+GAMES = [
+    "hand_detection.py",
+    "fechar_Abrir.py",
+    "filling_bar.py",
+    "number_fingers.py",
+    "number_hands.py",
+    "missing_letter.py",
+    "memory_sequence.py",
+    "music_count.py",
+    "music.py",
+]
+
+# cv2 calls the games use to draw their HUD (bars, boxes, numbers, text)
+HUD_FUNCTIONS = ["putText", "getTextSize", "rectangle", "circle", "ellipse", "line"]
+
+STAGES = ["read", "flip", "convert", "inference", "track", "classify", "draw_landmarks", "hud", "display", "frame", "latency"]
+
+# Video clips run the real hand detector; landmark files (.jsonl, .hsr) replay
+# recorded hands on blank frames and leave inference, flip and convert untimed
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+# Stages (besides fps) that mostly time the hand detector itself
+DETECTOR_STAGES = ("inference", "frame", "latency")
+
+CLIPS_DIR = os.path.join("benchmarks", "clips")
+BASELINE_FILE = os.path.join("benchmarks", "baseline.json")
+
+M_MMAP_THRESHOLD = -3  # glibc mallopt parameter
+
+
+# glibc raises its mmap threshold after large blocks are freed, so from run to
+# run the frames come either as fresh zero pages or as reused heap memory, and
+# reading and flipping them takes several times longer in one case. Fixing the
+# threshold keeps runs comparable with the baseline.
+def pin_malloc_threshold(size=128 * 1024):
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        ctypes.CDLL(None).mallopt(M_MMAP_THRESHOLD, size)
+    except (OSError, AttributeError):
+        pass  # Not glibc
+
+
+# Clip for a game: benchmarks/clips/<game>.* first, then benchmarks/clips/default.*;
+# only videos unless landmarks is set
+def find_clip(clips_dir, game, landmarks=False):
+    name = os.path.splitext(game)[0]
+    for pattern in (f"{name}.*", "default.*"):
+        matches = sorted(path for path in glob.glob(os.path.join(clips_dir, pattern))
+                         if landmarks or os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS)
+        if matches:
+            return matches[0]
+    return None
+
+
+# A second of silence for the music games, which need an audio file to load
+def write_silence(path, rate=8000):
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(rate)
+        file.writeframes(bytes(2 * rate))
+
+
+# Time of a fixed workload like one frame of a game (flip, colour conversion,
+# resize, blur, text and some Python), in ms: the fastest of several runs, so
+# a baseline from another machine can be scaled to this one
+def calibrate(repeats=7, frames=20):
+    frame = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(frames):
+            flipped = cv2.flip(frame, 1)
+            rgb = cv2.cvtColor(flipped, cv2.COLOR_BGR2RGB)
+            cv2.GaussianBlur(cv2.resize(rgb, (320, 240)), (5, 5), 0)
+            cv2.putText(flipped, "calibration", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            sum(index * index for index in range(2000))
+        best = min(best, time.perf_counter() - start)
+    return best / frames * 1000
+
+
+def mediapipe_version():
+    try:
+        import mediapipe
+    except ImportError:
+        return None
+    return getattr(mediapipe, "__version__", None)
+
+
+def machine_info():
+    return {"host": platform.node(), "machine": platform.machine(), "python": platform.python_version(),
+            "mediapipe": mediapipe_version(), "calibration_ms": calibrate()}
+
+
+# Time the game-side stages by wrapping the functions the games call, for the
+# duration of one run; the engine stages are timed through game_io.stage_timer
+@contextlib.contextmanager
+def instrumented(timer):
+    patches = [(cv2, name, "hud") for name in HUD_FUNCTIONS]
+    patches.append((hud.HudLayer, "draw_on", "hud"))  # Compositing cached HUD layers
+    patches.append((SkeletonRenderer, "draw", "draw_landmarks"))
+    for display_class in (game_io.WindowDisplay, game_io.HeadlessDisplay):
+        patches.append((display_class, "show", "display"))
+        patches.append((display_class, "wait_key", "display"))
+
+    originals = []
+    for owner, name, stage in patches:
+        original = getattr(owner, name)
+        originals.append((owner, name, original))
+        setattr(owner, name, timer.wrap(stage, original))
+    game_io.stage_timer = timer
+    try:
+        yield
+    finally:
+        game_io.stage_timer = None
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+# Run one game script headless over a clip, with its prints silenced.
+# game_args are extra game options, e.g. ["--inference-width", "640"].
+def run_game_script(game, clip, seed, max_frames=None, game_args=()):
+    argv = [game, "--replay", clip, "--headless", "--seed", str(seed)]
+    if max_frames is not None:
+        argv += ["--max-frames", str(max_frames)]
+    argv += list(game_args)
+    saved_argv = sys.argv
+    sys.argv = argv
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            runpy.run_path(game, run_name="__main__")
+    except SystemExit:
+        pass
+    finally:
+        sys.argv = saved_argv
+
+
+def benchmark_game(game, clip, seed=0, max_frames=None, alloc_frames=100, game_args=()):
+    timer = StageTimer()
+    start = time.perf_counter()
+    with instrumented(timer):
+        run_game_script(game, clip, seed, max_frames, game_args)
+    elapsed = time.perf_counter() - start
+
+    frames = len(timer.samples["flip"])  # One per processed frame, tracked or detected
+    result = {
+        "clip": clip,
+        "detector": os.path.splitext(clip)[1].lower() in VIDEO_EXTENSIONS,
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "stages": timer.summary(),
+    }
+
+    # Allocations are measured on a separate, shorter run since tracing slows everything down
+    if alloc_frames:
+        tracemalloc.start()
+        try:
+            run_game_script(game, clip, seed, alloc_frames, game_args)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["alloc_net_kb"] = current / 1024
+        result["alloc_peak_kb"] = peak / 1024
+    return result
+
+
+# Best of several runs of a game: the highest fps and, per stage, the timings
+# of the run with the lowest p95, so a busy moment on the machine doesn't count
+def best_of(runs):
+    best = dict(max(runs, key=lambda result: result["fps"]))
+    best["stages"] = {}
+    for stage in runs[0]["stages"]:
+        best["stages"][stage] = min((result["stages"][stage] for result in runs if stage in result["stages"]),
+                                    key=lambda stats: stats["p95_ms"])
+    for key in ("alloc_net_kb", "alloc_peak_kb"):
+        if key in runs[0]:
+            best[key] = runs[0][key]
+    return best
+
+
+# Compare a run with the stored baseline's games; returns a list of regression
+# messages. scale is how much slower this machine is than the baseline's
+# (1 on the same machine): baseline times are multiplied by it, fps divided.
+# Without compare_detector, fps and the detector stages are left out (the
+# baseline was recorded with another version of Mediapipe).
+def find_regressions(results, baseline, tolerance, min_delta_ms=0.2, scale=1.0, compare_detector=True):
+    regressions = []
+    for game, result in results.items():
+        if game not in baseline or "error" in result or "error" in baseline[game]:
+            continue
+        base = baseline[game]
+        base_fps = base["fps"] / scale
+        if compare_detector and result["fps"] < base_fps * (1 - tolerance):
+            regressions.append(f"{game}: fps {result['fps']:.1f} < baseline {base_fps:.1f}")
+        for stage, stats in result["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if base_stats is None or (stage in DETECTOR_STAGES and not compare_detector):
+                continue
+            base_p95 = base_stats["p95_ms"] * scale
+            if stats["p95_ms"] > base_p95 * (1 + tolerance) and stats["p95_ms"] - base_p95 > min_delta_ms:
+                regressions.append(f"{game}: {stage} p95 {stats['p95_ms']:.2f} ms > baseline {base_p95:.2f} ms")
+    return regressions
+
+
+# How much slower this machine is than the one that recorded the baseline,
+# from their calibration times; 1 for the same host or an old baseline
+def baseline_scale(machine, base_machine):
+    if not base_machine or base_machine.get("host") == machine["host"]:
+        return 1.0
+    return machine["calibration_ms"] / base_machine["calibration_ms"]
+
+
+def print_report(results):
+    for game, result in results.items():
+        if "error" in result:
+            print(f"\n{game}: FAILED ({result['error']})")
+            continue
+        print(f"\n{game}: {result['frames']} frames, {result['fps']:.1f} fps  [{result['clip']}]")
+        if not result.get("detector", True):
+            print("  landmark replay: the hand detector did not run")
+        if "alloc_peak_kb" in result:
+            print(f"  allocations: peak {result['alloc_peak_kb']:.0f} KB, net {result['alloc_net_kb']:.0f} KB")
+        print(f"  {'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage in STAGES:
+            stats = result["stages"].get(stage)
+            if stats is None:
+                continue
+            print(f"  {stage:<16}{stats['count']:>7}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+
+def main():
+    pin_malloc_threshold()
+    parser = argparse.ArgumentParser(description="Per-stage latency benchmark for the hand detection games")
+    parser.add_argument("--games", nargs="+", default=GAMES, help="game scripts to run")
+    parser.add_argument("--clips-dir", default=CLIPS_DIR, help="folder with <game>.mp4 or default.mp4 clips")
+    parser.add_argument("--landmark-clips", action="store_true",
+                        help="also use .jsonl/.hsr clips (the hand detector does not run on them)")
+    parser.add_argument("--max-frames", type=int, help="frames per game (default: whole clip)")
+    parser.add_argument("--alloc-frames", type=int, default=100, help="frames for the allocation run (0 to skip)")
+    parser.add_argument("--runs", type=int, default=1, help="runs per game, keeping the best timings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    # Options the benchmark does not know are passed on to the games
+    args, game_args = parser.parse_known_args()
+
+    machine = machine_info()
+    results = {}
+    with tempfile.TemporaryDirectory() as music_dir:
+        # The music games play a silent file unless MUSIC_FILE names one
+        if "MUSIC_FILE" not in os.environ:
+            os.environ["MUSIC_FILE"] = os.path.join(music_dir, "silence.wav")
+            write_silence(os.environ["MUSIC_FILE"])
+        for game in args.games:
+            clip = find_clip(args.clips_dir, game, args.landmark_clips)
+            if clip is None:
+                results[game] = {"error": f"no video clip in {args.clips_dir}"}
+                continue
+            try:
+                # Allocations are only measured with the first run
+                runs = [benchmark_game(game, clip, args.seed, args.max_frames, args.alloc_frames if run == 0 else 0,
+                                       game_args) for run in range(max(args.runs, 1))]
+                results[game] = best_of(runs)
+            except Exception as error:
+                results[game] = {"error": f"{type(error).__name__}: {error}"}
+
+    print_report(results)
+    print(f"\nMachine: {machine['host']}, calibration {machine['calibration_ms']:.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as file:
+            json.dump({"machine": machine, "games": results}, file, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        base_machine = baseline.get("machine")
+        scale = baseline_scale(machine, base_machine)
+        if scale != 1.0:
+            print(f"Baseline recorded on {base_machine['host']}: its timings are scaled by {scale:.2f} from the "
+                  f"calibration runs. Save a baseline on this machine (--save-baseline) for an exact comparison.")
+        compare_detector = base_machine is None or base_machine.get("mediapipe") == machine["mediapipe"]
+        if not compare_detector:
+            print(f"Baseline recorded with Mediapipe {base_machine.get('mediapipe') or 'unknown'}, this is "
+                  f"{machine['mediapipe'] or 'unknown'}: fps and the {', '.join(DETECTOR_STAGES)} stages are not compared.")
+        regressions = find_regressions(results, baseline.get("games", baseline), args.tolerance, scale=scale,
+                                       compare_detector=compare_detector)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import argparse
+import math
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Builds the benchmark's default video clip from hands.jpg (a photo of two open
+# hands on a white background), so the benchmark runs the real hand detector on
+# real hands. The hands drift, turn and change size the way a player moves, and
+# the clip goes through both hands, each hand alone and no hands, so detection,
+# tracking and the games' hand counts all get exercised.
+
+FPS = 15
+SIZE = (640, 480)
+# (frames, which part of the photo is shown) in order
+PHASES = [
+    (120, "both"),
+    (60, "left"),
+    (60, "right"),
+    (30, "none"),
+    (30, "both"),
+]
+
+
+# The photo with the hands that are not shown painted over with its middle
+# column, which is background from top to bottom (the gap between the hands)
+def photo_part(photo, part):
+    if part == "both":
+        return photo
+    shown = photo.copy()
+    half = photo.shape[1] // 2
+    middle = photo[:, half:half + 1]
+    if part != "left":
+        shown[:, :half] = middle
+    if part != "right":
+        shown[:, half:] = middle
+    return shown
+
+
+# One frame: the photo moved, turned and scaled for time t. The borders repeat
+# the photo's edges, so its background fills the frame without a seam.
+def render(photo, part, t):
+    width, height = SIZE
+    scale = width / photo.shape[1] * (0.85 + 0.1 * math.sin(t * 0.9))
+    angle = 6 * math.sin(t * 1.3)
+    matrix = cv2.getRotationMatrix2D((photo.shape[1] / 2, photo.shape[0] / 2), angle, scale)
+    matrix[0, 2] += width / 2 - photo.shape[1] / 2 + 30 * math.sin(t * 0.7)
+    matrix[1, 2] += height / 2 - photo.shape[0] / 2 + 20 * math.cos(t * 1.1)
+    return cv2.warpAffine(photo_part(photo, part), matrix, SIZE, borderMode=cv2.BORDER_REPLICATE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the benchmark video clip from hands.jpg")
+    parser.add_argument("--photo", default="hands.jpg")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "clips", "default.mp4"))
+    args = parser.parse_args()
+
+    photo = cv2.imread(args.photo)
+    if photo is None:
+        print(f"Unable to read {args.photo}")
+        return 1
+    writer = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*"mp4v"), FPS, SIZE)
+    if not writer.isOpened():
+        print(f"Unable to write {args.output}")
+        return 1
+    frame_index = 0
+    for frames, part in PHASES:
+        for _ in range(frames):
+            writer.write(render(photo, part, frame_index / FPS))
+            frame_index += 1
+    writer.release()
+    print(f"{args.output}: {frame_index} frames, {os.path.getsize(args.output) // 1024} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
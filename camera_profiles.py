@@ -0,0 +1,292 @@
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+# Capture profiles: how a camera is opened (pixel format, size, fps, driver
+# buffer and exposure). cv2.VideoCapture's defaults are often a raw YUYV stream
+# at a size and rate the games don't want, with several frames buffered in the
+# driver, which all add latency. The first time a camera is used for some needs,
+# its modes are probed and timed for a moment; the fastest one that meets the
+# needs is cached per device in camera_profiles.json (or CAMERA_PROFILES), so
+# later launches open the camera already configured.
+
+PROFILE_CACHE = os.environ.get("CAMERA_PROFILES", "camera_profiles.json")
+
+# What a game needs from the camera: at least this size and frame rate
+CameraNeeds = namedtuple("CameraNeeds", ["width", "height", "fps"])
+DEFAULT_NEEDS = CameraNeeds(640, 480, 30)
+
+# exposure is None to leave auto exposure on, else the locked exposure value
+# (in the backend's units); buffer_size is None where the driver ignores it
+CaptureProfile = namedtuple("CaptureProfile", ["fourcc", "width", "height", "fps", "buffer_size", "exposure"])
+
+FORMATS = ("MJPG", "YUYV")
+SIZES = ((640, 480), (800, 600), (960, 540), (1280, 720), (1920, 1080))
+# Manual and auto values of CAP_PROP_AUTO_EXPOSURE per backend; exposure is
+# only locked where the units of CAP_PROP_EXPOSURE are known
+EXPOSURE_MODES = {"V4L2": (1, 3), "DSHOW": (0.25, 0.75)}
+FRAME_RATE_TOLERANCE = 0.9  # Measured fps may be this much of the asked one
+
+cache_lock = threading.Lock()
+
+
+# Needs covering all of them (a game host opens the camera once for every game)
+def combined_needs(needs_list):
+    needs_list = list(needs_list)
+    return CameraNeeds(max(needs.width for needs in needs_list), max(needs.height for needs in needs_list),
+                       max(needs.fps for needs in needs_list))
+
+
+def needs_key(needs):
+    return f"{needs.width}x{needs.height}@{needs.fps}"
+
+
+# Stable name of the camera at this index: its /dev/v4l/by-id link or its
+# V4L2 name on Linux, else the index
+def device_id(index):
+    if sys.platform.startswith("linux"):
+        device = f"/dev/video{index}"
+        for link in sorted(glob.glob("/dev/v4l/by-id/*")):
+            if os.path.realpath(link) == device:
+                return os.path.basename(link)
+        try:
+            with open(f"/sys/class/video4linux/video{index}/name") as file:
+                return f"{file.read().strip()} (video{index})"
+        except OSError:
+            pass
+    return f"camera {index}"
+
+
+def fourcc_name(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * shift) & 0xFF) for shift in range(4)).strip("\0")
+
+
+def backend_name(cap):
+    try:
+        return cap.getBackendName()
+    except cv2.error:
+        return ""
+
+
+# Ask the driver for a mode; returns (fourcc, width, height) it actually gave
+def request_mode(cap, fourcc, width, height, fps):
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    return (fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+
+# Keep one frame in the driver so reads get the newest one; True if it took
+def set_small_buffer(cap):
+    return bool(cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)) and cap.get(cv2.CAP_PROP_BUFFERSIZE) == 1
+
+
+# Longest exposure that still allows fps frames a second, in the backend's units
+def exposure_limit(backend, fps):
+    if backend == "V4L2":
+        return 10000 / fps  # exposure_time_absolute, in 100 µs
+    return math.floor(math.log2(1 / fps))  # DirectShow: log2 of seconds
+
+
+# Switch auto exposure off at the value it settled on, shortened to fit the
+# frame rate; returns the value, or None where exposure can't be locked
+def lock_exposure(cap, fps):
+    backend = backend_name(cap)
+    if backend not in EXPOSURE_MODES:
+        return None
+    value = min(cap.get(cv2.CAP_PROP_EXPOSURE), exposure_limit(backend, fps))
+    if not cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, EXPOSURE_MODES[backend][0]):
+        return None
+    cap.set(cv2.CAP_PROP_EXPOSURE, value)
+    return value
+
+
+# Give the exposure back to the camera (the setting outlives our process on V4L2)
+def unlock_exposure(cap):
+    backend = backend_name(cap)
+    if backend in EXPOSURE_MODES:
+        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, EXPOSURE_MODES[backend][1])
+
+
+# Frames per second actually delivered, after a few frames to let the mode
+# and the auto exposure settle; 0 when frames stop coming
+def measure_fps(cap, frames=15, warm_up=5):
+    for _ in range(warm_up):
+        if not cap.read()[0]:
+            return 0.0
+    read_times = []
+    for _ in range(frames):
+        if not cap.read()[0]:
+            return 0.0
+        read_times.append(time.perf_counter())
+    duration = read_times[-1] - read_times[0]
+    return (len(read_times) - 1) / duration if duration > 0 else 0.0
+
+
+# Set an open camera to a profile; False when the driver didn't take it
+def apply_profile(cap, profile):
+    fourcc, width, height = request_mode(cap, profile.fourcc, profile.width, profile.height, profile.fps)
+    if profile.buffer_size is not None:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, profile.buffer_size)
+    if profile.exposure is not None:
+        backend = backend_name(cap)
+        if backend in EXPOSURE_MODES:
+            cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, EXPOSURE_MODES[backend][0])
+            cap.set(cv2.CAP_PROP_EXPOSURE, profile.exposure)
+    # Some backends don't report the pixel format
+    return (width, height) == (profile.width, profile.height) and fourcc in (profile.fourcc, "")
+
+
+def meets(measured_fps, needs):
+    return measured_fps >= needs.fps * FRAME_RATE_TOLERANCE
+
+
+# Try the camera's modes from the smallest size that meets the needs up, and
+# stop at the first size with a mode fast enough. Returns the best profile
+# (fastest, then smallest) with its measured fps, and every (profile, fps) tried.
+def probe(cap, needs, frames=15):
+    tried = []
+    seen = set()
+    rates = sorted({needs.fps, max(needs.fps, 60)})
+    sizes = [size for size in SIZES if size[0] >= needs.width and size[1] >= needs.height]
+    if (needs.width, needs.height) not in sizes:
+        sizes.insert(0, (needs.width, needs.height))
+    for width, height in sizes:
+        for fourcc in FORMATS:
+            for fps in rates:
+                mode = request_mode(cap, fourcc, width, height, fps)
+                if mode[1:] != (width, height) or mode + (fps,) in seen:
+                    continue
+                seen.add(mode + (fps,))
+                buffer_size = 1 if set_small_buffer(cap) else None
+                profile = CaptureProfile(mode[0] or fourcc, width, height, fps, buffer_size, None)
+                tried.append((profile, measure_fps(cap, frames)))
+        if any(meets(measured, needs) for profile, measured in tried if profile.width == width):
+            break
+    if not tried:
+        return None, 0.0, tried
+
+    # Rates within a tenth of the needed one count as the same, so timing noise doesn't pick the mode
+    best, best_fps = max(tried, key=lambda entry: (meets(entry[1], needs), round(entry[1] / needs.fps * 10),
+                                                   -entry[0].width * entry[0].height, entry[0].fourcc == "MJPG"))
+    # Lock the exposure if that is no slower: auto exposure lengthens it in
+    # dim light and the frame rate drops in the middle of a game
+    apply_profile(cap, best)
+    exposure = lock_exposure(cap, best.fps)
+    if exposure is not None:
+        locked_fps = measure_fps(cap, frames)
+        tried.append((best._replace(exposure=exposure), locked_fps))
+        if locked_fps >= best_fps * 0.98:
+            best, best_fps = best._replace(exposure=exposure), locked_fps
+        else:
+            unlock_exposure(cap)
+    return best, best_fps, tried
+
+
+def load_cache(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_profile(path, device, needs, profile, measured_fps):
+    with cache_lock:
+        profiles = load_cache(path)
+        entry = dict(profile._asdict(), measured_fps=round(measured_fps, 1))
+        profiles.setdefault(device, {})[needs_key(needs)] = entry
+        temporary_path = path + ".tmp"
+        try:
+            with open(temporary_path, "w") as file:
+                json.dump(profiles, file, indent=2)
+            os.replace(temporary_path, path)
+        except OSError as error:
+            print(f"Could not save the camera profile: {error}")
+
+
+def cached_profile(path, device, needs):
+    entry = load_cache(path).get(device, {}).get(needs_key(needs))
+    if entry is None:
+        return None
+    try:
+        return CaptureProfile(*(entry[field] for field in CaptureProfile._fields))
+    except KeyError:
+        return None
+
+
+# Open camera index configured for the needs: with the cached profile for this
+# device, or after probing it (when there is none, it no longer applies, or
+# reprobe is set). Returns the VideoCapture and the profile used (None when the
+# camera could not be opened or probed, leaving the driver's defaults).
+def open_camera(index, needs=DEFAULT_NEEDS, path=PROFILE_CACHE, reprobe=False):
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        return cap, None
+    device = device_id(index)
+    profile = None if reprobe else cached_profile(path, device, needs)
+    if profile is not None:
+        if apply_profile(cap, profile):
+            return cap, profile
+        print(f"Camera {device} no longer takes its cached profile, probing it again")
+
+    print(f"Probing camera {device} for {needs_key(needs)} (only done once)")
+    profile, measured_fps, _ = probe(cap, needs)
+    if profile is None:
+        return cap, None
+    apply_profile(cap, profile)
+    save_profile(path, device, needs, profile, measured_fps)
+    print(f"Camera profile: {describe(profile)}, {measured_fps:.1f} fps measured")
+    return cap, profile
+
+
+def describe(profile):
+    exposure = "auto exposure" if profile.exposure is None else f"exposure locked at {profile.exposure:g}"
+    buffer = "default buffer" if profile.buffer_size is None else f"buffer {profile.buffer_size}"
+    return f"{profile.fourcc} {profile.width}x{profile.height}@{profile.fps}, {buffer}, {exposure}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe a camera's capture modes and cache the fastest one")
+    parser.add_argument("--camera", type=int, default=0, help="camera index")
+    parser.add_argument("--width", type=int, default=DEFAULT_NEEDS.width, help="smallest frame width needed")
+    parser.add_argument("--height", type=int, default=DEFAULT_NEEDS.height, help="smallest frame height needed")
+    parser.add_argument("--fps", type=int, default=DEFAULT_NEEDS.fps, help="frame rate needed")
+    parser.add_argument("--cache", default=PROFILE_CACHE, help="profile cache file")
+    args = parser.parse_args()
+
+    needs = CameraNeeds(args.width, args.height, args.fps)
+    cap = cv2.VideoCapture(args.camera)
+    if not cap.isOpened():
+        print(f"Unable to open camera {args.camera}")
+        return 1
+    device = device_id(args.camera)
+    print(f"Probing {device} ({backend_name(cap)}) for {needs_key(needs)}")
+    best, best_fps, tried = probe(cap, needs)
+    for profile, measured_fps in tried:
+        print(f"  {describe(profile):<60}{measured_fps:6.1f} fps")
+    if best is None:
+        print("No capture mode could be set")
+        cap.release()
+        return 1
+    save_profile(args.cache, device, needs, best, best_fps)
+    print(f"Cached for {device}: {describe(best)}, {best_fps:.1f} fps")
+    if best.exposure is not None:
+        unlock_exposure(cap)
+    cap.release()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import math
+
+import cv2
+import numpy as np
+
+from landmarks import classify_points
+from preprocess import results_from_points
+
+
+# Moves the landmarks between Mediapipe runs with sparse optical flow, so Mediapipe
+# only has to run every few frames.
+# The cadence adapts to the measured inference time: Mediapipe may use at most
+# inference_share of the frame budget (1 / target_fps) on average, so a slow CPU
+# runs it every 2-3 frames and a fast one on every frame. Mediapipe runs again
+# straight away when the hands move too far, when tracking loses points (forward-
+# backward check) or when no hands are tracked.
+class FlowTracker:
+    def __init__(self, target_fps=30, inference_share=0.5, max_interval=4, flow_width=320,
+                 max_motion=0.04, max_error=1.0, min_tracked=0.8):
+        self.target_fps = target_fps
+        self.inference_share = inference_share
+        self.max_interval = max_interval
+        self.flow_width = flow_width
+        self.max_motion = max_motion  # Fraction of the frame width per frame
+        self.max_error = max_error  # Forward-backward error in flow pixels
+        self.min_tracked = min_tracked
+        self.lk_params = dict(winSize=(15, 15), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.inference_time = None
+        self.reset()
+
+    # Forget the tracked hands, e.g. when a new game starts
+    def reset(self):
+        self.gray = None
+        self.previous_gray = None
+        self.points = None
+        self.is_right = None
+        self.scores = None
+        self.handedness = None
+        self.frames_since_inference = 0
+
+    # Frames per Mediapipe run for the measured inference time
+    @property
+    def interval(self):
+        if self.inference_time is None:
+            return 1
+        budget = self.inference_share / self.target_fps
+        return int(min(max(math.ceil(self.inference_time / budget), 1), self.max_interval))
+
+    # Small grayscale copy of the frame used for the flow
+    def to_gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if gray.shape[1] > self.flow_width:
+            height = max(1, round(gray.shape[0] * self.flow_width / gray.shape[1]))
+            gray = cv2.resize(gray, (self.flow_width, height), interpolation=cv2.INTER_AREA)
+        return gray
+
+    # Try to follow the hands into this (flipped, BGR) frame.
+    # Returns (results, hands), or None when Mediapipe has to run on it.
+    def track(self, frame):
+        self.previous_gray, self.gray = self.gray, self.to_gray(frame)
+        if (self.points is None or len(self.points) == 0 or self.previous_gray is None
+                or self.frames_since_inference + 1 >= self.interval):
+            return None
+
+        height, width = self.gray.shape
+        scale = np.array([width, height], dtype=np.float32)
+        start = (self.points[:, :, :2].reshape(-1, 1, 2) * scale).astype(np.float32)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self.previous_gray, self.gray, start, None, **self.lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(self.gray, self.previous_gray, moved, None, **self.lk_params)
+
+        # Low confidence: too many points lost or not coming back to where they started
+        error = np.linalg.norm((back - start).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < self.max_error)
+        if good.mean() < self.min_tracked:
+            return None
+
+        # Large motion: let Mediapipe find the hands again
+        shift = (moved - start).reshape(-1, 2)[good]
+        if np.median(np.linalg.norm(shift, axis=1)) > self.max_motion * width:
+            return None
+
+        # Points that were lost follow the median motion of their hand
+        shift_all = (moved - start).reshape(self.points.shape[0], 21, 2)
+        good = good.reshape(self.points.shape[0], 21)
+        for hand_idx in range(len(shift_all)):
+            if good[hand_idx].any():
+                shift_all[hand_idx][~good[hand_idx]] = np.median(shift_all[hand_idx][good[hand_idx]], axis=0)
+            else:
+                shift_all[hand_idx] = 0
+
+        points = self.points.copy()
+        points[:, :, :2] += shift_all / scale
+        self.points = points
+        self.frames_since_inference += 1
+        return results_from_points(points, self.handedness), classify_points(points, self.is_right, self.scores)
+
+    # Start tracking from the hands Mediapipe just found on the frame given to track()
+    def seed(self, results, hands, inference_seconds):
+        if self.inference_time is None:
+            self.inference_time = inference_seconds
+        else:
+            self.inference_time = 0.8 * self.inference_time + 0.2 * inference_seconds
+        self.points = hands.points
+        self.is_right = hands.is_right
+        self.scores = hands.scores
+        self.handedness = results.multi_handedness
+        self.frames_since_inference = 0
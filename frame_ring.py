@@ -0,0 +1,106 @@
+import os
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Header: slot count and slot size, then per slot its sequence number,
+# capture timestamp and image shape
+HEADER_FIELDS = 2
+SLOT_FIELDS = 5  # seq, timestamp, height, width, channels
+
+
+# Attach to a block made by another process without tracking it here. Before
+# Python 3.13 (track=False) attaching registers the block with the resource
+# tracker, which warns about a leak or even unlinks it when this process exits,
+# while the process that made it still uses it; the registration is undone
+# right away. Spawned processes share their parent's tracker, where that also
+# drops the owner's entry, so the owner registers it again before unlinking.
+def attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+# Fixed-slot ring of frames in shared memory, so processes hand frames to each
+# other by sequence number instead of pickling them. Frame n goes to slot
+# n % slots; a reader gets a numpy view straight into the shared block.
+# A slot's sequence number is cleared while it is being written, so a reader
+# can tell (with is_current) whether the frame it looked at was overwritten.
+# The process that creates the ring owns it and unlinks it; others attach by name.
+class FrameRing:
+    def __init__(self, name=None, slots=4, slot_bytes=0):
+        if name is None:
+            header_bytes = (HEADER_FIELDS + slots * SLOT_FIELDS) * 8
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * slot_bytes)
+            self.owner = True
+        else:
+            self.shm = attach(name)
+            self.owner = False
+
+        self.info = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self.info[:] = (slots, slot_bytes)
+        self.slots, self.slot_bytes = int(self.info[0]), int(self.info[1])
+        self.header = np.ndarray((self.slots, SLOT_FIELDS), dtype=np.float64, buffer=self.shm.buf,
+                                 offset=HEADER_FIELDS * 8)
+        self.data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf,
+                               offset=(HEADER_FIELDS + self.slots * SLOT_FIELDS) * 8)
+        if self.owner:
+            self.header[:] = 0
+        self.last_seq = 0
+
+    # Ring with room for frames of this shape
+    @classmethod
+    def for_shape(cls, shape, slots=4):
+        return cls(slots=slots, slot_bytes=int(np.prod(shape)))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def fits(self, shape):
+        return int(np.prod(shape)) <= self.slot_bytes
+
+    # Contiguous uint8 view of a slot's first bytes in the given shape
+    def view(self, slot, shape):
+        return self.data[slot, :int(np.prod(shape))].reshape(shape)
+
+    # Copy one frame into the next slot. Returns its sequence number.
+    def write(self, frame, timestamp=0.0):
+        seq = self.last_seq + 1
+        slot = seq % self.slots
+        self.header[slot, 0] = 0  # Being written
+        np.copyto(self.view(slot, frame.shape), frame)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        self.header[slot, 1:] = (timestamp, height, width, channels)
+        self.header[slot, 0] = seq
+        self.last_seq = seq
+        return seq
+
+    def is_current(self, seq):
+        return self.header[seq % self.slots, 0] == seq
+
+    # View of frame seq and its capture timestamp, or (None, None) once the slot was reused
+    def read(self, seq):
+        slot = seq % self.slots
+        if not self.is_current(seq):
+            return None, None
+        timestamp, height, width, channels = self.header[slot, 1:]
+        shape = (int(height), int(width)) if channels == 1 else (int(height), int(width), int(channels))
+        return self.view(slot, shape), timestamp
+
+    def close(self):
+        # Views into the block have to go before it can be closed
+        self.info = self.header = self.data = None
+        self.shm.close()
+        if self.owner:
+            # An attached process sharing our resource tracker may have dropped the entry (see attach)
+            if os.name == "posix":
+                resource_tracker.register(self.shm._name, "shared_memory")
+            self.shm.unlink()
@@ -0,0 +1,121 @@
+import argparse
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+from camera_profiles import combined_needs
+from fechar_Abrir import FecharAbrirGame
+from filling_bar import FillingBarGame
+from game_io import open_game_io
+from hand_detection import HandDetectionGame
+from host_protocol import HOST_ADDRESS, HOST_KEY_ENV, host_authkey
+from memory_sequence import MemorySequenceGame
+from missing_letter import MissingLetterGame
+from music import MusicGame
+from music_count import MusicCountGame
+from number_fingers import NumberFingersGame
+from number_hands import NumberHandsGame
+
+# Every game the host can run, by plugin name
+GAMES = {game.name: game for game in (
+    HandDetectionGame,
+    FecharAbrirGame,
+    FillingBarGame,
+    NumberFingersGame,
+    NumberHandsGame,
+    MissingLetterGame,
+    MemorySequenceGame,
+    MusicCountGame,
+    MusicGame,
+)}
+
+
+# Long-lived game host: keeps one camera, one engine and its Mediapipe
+# detectors warm, and runs the games in-process one after another
+class GameHost:
+    def __init__(self, engine, display, clock, split_sides=False):
+        self.engine = engine
+        self.display = display
+        self.clock = clock
+        # --flow-tracking on the host's command line turns it on for every game
+        self.always_flow_tracking = engine.flow_tracking
+        # --split-sides turns it on for the two-sided games
+        self.split_sides = split_sides
+
+    def play(self, name):
+        game_class = GAMES[name]
+        start = time.perf_counter()
+        self.engine.configure(game_class.max_num_hands, game_class.flip,
+                              game_class.flow_tracking or self.always_flow_tracking,
+                              self.split_sides and game_class.two_sided)
+        game = game_class(self.engine, self.display, self.clock)
+        print(f"Starting {name} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        try:
+            game.run()
+        finally:
+            # Close all windows
+            self.display.close()
+
+
+# Answer ("play", name) and ("quit",) requests from the launcher that started
+# this host; connections without its key are turned away before anything is read
+def serve(host, authkey, address=HOST_ADDRESS):
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Game host listening on {address[0]}:{address[1]}")
+        while True:
+            try:
+                connection = listener.accept()
+            except AuthenticationError:
+                print("Game host: refused a connection with the wrong key")
+                continue
+            with connection:
+                while True:
+                    try:
+                        request = connection.recv()
+                    except EOFError:
+                        break  # Launcher went away; wait for the next one
+
+                    if request[0] == "play":
+                        name = request[1]
+                        try:
+                            host.play(name)
+                            connection.send(("done", name))
+                        except Exception as error:
+                            connection.send(("error", f"{type(error).__name__}: {error}"))
+                    elif request[0] == "quit":
+                        connection.send(("bye",))
+                        return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the games from one warm process")
+    parser.add_argument("--play", nargs="+", choices=sorted(GAMES), help="play these games in order and exit")
+    parser.add_argument("--split-sides", action="store_true",
+                        help="run one hand detector on each half of the frame in left vs right games")
+    args, _ = parser.parse_known_args()
+
+    authkey = host_authkey()
+    if not args.play and authkey is None:
+        print(f"The game host only serves the launcher that starts it (the key comes in {HOST_KEY_ENV})")
+        return
+
+    # The camera stays open across games, so it is set up for the most demanding one
+    engine, display, clock = open_game_io(max_num_hands=2,
+                                          camera_needs=combined_needs(game.camera_needs for game in GAMES.values()))
+
+    # Check if camera opened successfully
+    if not engine.is_opened():
+        print("Unable to open camera")
+        return
+
+    with engine:
+        host = GameHost(engine, display, clock, args.split_sides)
+        if args.play:
+            for name in args.play:
+                host.play(name)
+        else:
+            serve(host, authkey)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import os
+import random
+
+import cv2
+
+from camera_profiles import DEFAULT_NEEDS, PROFILE_CACHE
+from hand_engine import CameraSource, HandEngine, SystemClock
+from render_thread import RenderedDisplay
+from replay import LandmarkFileSource, LandmarkRecorder, ReplayClock, VideoFileSource
+from session_file import SessionFileSource, SessionRecorder
+from skeleton import DETAIL_LEVELS
+from telemetry import SessionTelemetry
+
+# StageTimer handed to every engine opened here; set by benchmark.py
+stage_timer = None
+
+
+# Normal on-screen window
+class WindowDisplay:
+    headless = False
+    skeleton_detail = "full"
+
+    # Called with the camera frame before the game draws on it
+    def begin_frame(self, frame):
+        pass
+
+    def show(self, window_name, frame):
+        cv2.imshow(window_name, frame)
+
+    def wait_key(self, delay=1):
+        return cv2.waitKey(delay)
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+# Display for servers and CI: nothing is drawn on screen and waits only move
+# the clock forward. A wait for a key press (delay <= 0) answers with 'q' so
+# end screens close on their own.
+class HeadlessDisplay:
+    headless = True
+    skeleton_detail = "full"
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.frames_shown = 0
+        self.last_frame = None
+
+    def begin_frame(self, frame):
+        pass
+
+    def show(self, window_name, frame):
+        self.frames_shown += 1
+        self.last_frame = frame
+
+    def wait_key(self, delay=1):
+        if delay <= 0:
+            return ord("q")
+        if hasattr(self.clock, "advance"):
+            self.clock.advance(delay / 1000)
+        return -1
+
+    def close(self):
+        pass
+
+
+# Command-line options shared by every game
+def parse_game_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hand detection game")
+    parser.add_argument("--camera", type=int, default=0, help="camera index to open")
+    parser.add_argument("--camera-defaults", action="store_true",
+                        help="open the camera with the driver's defaults instead of its cached capture profile")
+    parser.add_argument("--probe-camera", action="store_true",
+                        help="probe the camera's capture modes again and cache the fastest one")
+    parser.add_argument("--replay", help="play from a video file or a recorded landmark file (.jsonl or .hsr)")
+    parser.add_argument("--headless", action="store_true", help="run without opening a window")
+    parser.add_argument("--record-landmarks", help="write the detected landmarks to this .jsonl file, or a binary .hsr session file")
+    parser.add_argument("--render-fps", type=int, default=60,
+                        help="draw the camera image at this rate on its own thread, however fast hand detection "
+                             "runs (0: draw each game frame in the game loop)")
+    parser.add_argument("--skeleton-detail", choices=DETAIL_LEVELS, default="full",
+                        help="how the hand skeletons are drawn (low: thin lines only, for slow machines)")
+    parser.add_argument("--player", help="player name stored in a .hsr session recording (for the analytics)")
+    parser.add_argument("--seed", type=int, help="seed the random numbers/words so runs are repeatable")
+    parser.add_argument("--max-frames", type=int, help="stop after this many frames")
+    parser.add_argument("--inference-width", type=int, help="downscale frames to this width before hand detection")
+    parser.add_argument("--crop-hands", action="store_true", help="run hand detection only around the tracked hands")
+    parser.add_argument("--flow-tracking", action="store_true",
+                        help="follow the hands with optical flow between hand detections")
+    parser.add_argument("--split-sides", action="store_true",
+                        help="left vs right games: run one hand detector on each half of the frame")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="write performance telemetry (JSON lines and Prometheus text) to this folder")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+# Build the engine, display and clock for a game from the command line.
+# Live play uses the camera, a window drawn by its own render thread and the
+# wall clock; replays run every frame in order against a simulated clock.
+# --split-sides only applies to two_sided games (played in two halves of the screen).
+# The camera is opened with its fastest capture profile for camera_needs.
+def open_game_io(max_num_hands=2, flip=True, argv=None, flow_tracking=False, detector_factory=None,
+                 two_sided=False, camera_needs=DEFAULT_NEEDS):
+    args = parse_game_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.replay:
+        clock = ReplayClock()
+        if args.replay.endswith(".jsonl"):
+            source = LandmarkFileSource(args.replay, clock)
+        elif args.replay.endswith(".hsr"):
+            source = SessionFileSource(args.replay, clock)
+        else:
+            source = VideoFileSource(args.replay, clock)
+        threaded = False
+    else:
+        clock = SystemClock()
+        source = CameraSource(args.camera, camera_needs, None if args.camera_defaults else PROFILE_CACHE,
+                              args.probe_camera)
+        threaded = True
+
+    # .hsr files are binary session recordings (see session_file.py), anything else is .jsonl
+    recorder = None
+    if args.record_landmarks:
+        if args.record_landmarks.endswith(".hsr"):
+            recorder = SessionRecorder(args.record_landmarks, player=args.player)
+        else:
+            recorder = LandmarkRecorder(args.record_landmarks)
+
+    # Telemetry times the engine stages (passing them on to the benchmark's timer)
+    # and feeds the performance HUD; it only writes files with --telemetry
+    telemetry = SessionTelemetry(args.telemetry, timer=stage_timer)
+
+    engine = HandEngine(source, max_num_hands=max_num_hands, flip=flip, clock=clock,
+                        threaded=threaded, recorder=recorder, max_frames=args.max_frames,
+                        timer=telemetry, inference_width=args.inference_width,
+                        crop_to_hands=args.crop_hands, flow_tracking=flow_tracking or args.flow_tracking,
+                        detector_factory=detector_factory, split_sides=two_sided and args.split_sides,
+                        telemetry=telemetry)
+
+    if args.headless:
+        # No sound card on headless machines
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        display = HeadlessDisplay(clock)
+    elif threaded and args.render_fps > 0:
+        display = RenderedDisplay(engine, args.render_fps, timer=telemetry)
+    else:
+        display = WindowDisplay()
+    display.skeleton_detail = args.skeleton_detail
+    return engine, display, clock
@@ -1,45 +1,103 @@
+import argparse
+import os
 import tkinter as tk
 from tkinter import messagebox
 from PIL import Image, ImageTk
+import queue
 import subprocess
+import threading
+from host_protocol import HostClient
+from profiling import MODES, PROFILE_ENV
+
+# --profile MODE[:GAME,GAME...] profiles the games started from here (see profiling.py)
+parser = argparse.ArgumentParser(description="Hand detection games launcher")
+parser.add_argument("--profile", help=f"profile the games' frame loops ({' or '.join(MODES)}, optionally :game,game)")
+args, _ = parser.parse_known_args()
+if args.profile:
+    os.environ[PROFILE_ENV] = args.profile
+
+# Games run inside one long-lived game host process, which keeps the camera
+# and Mediapipe warm between games
+host = HostClient()
+
+
+# Function to run a game in the game host (or in a new process if the host can't be reached)
+def run_game(name):
+    if not host.play(name):
+        subprocess.run(['python', f'{name}.py'])
 
 
 def run_game1():
-    subprocess.run(['python', 'music_count.py'])
+    run_game('music_count')
 
 
 def run_game2():
-    subprocess.run(['python', 'number_fingers.py'])
+    run_game('number_fingers')
 
 
 def run_game3():
-    subprocess.run(['python', 'missing_letter.py'])
+    run_game('missing_letter')
 
 def run_game4():
-    subprocess.run(['python', 'fechar_Abrir.py'])
+    run_game('fechar_Abrir')
 
 def run_game5():
-    subprocess.run(['python', 'filling_bar.py'])
+    run_game('filling_bar')
 
 def run_game6():
-    subprocess.run(['python', 'memory_sequence.py'])
+    run_game('memory_sequence')
 
 
 def run_game7():
-    subprocess.run(['python', 'hand_detection.py'])
+    run_game('hand_detection')
 
 def run_game8():
-    subprocess.run(['python', 'number_hands.py'])
+    run_game('number_hands')
+
 
+# Leaderboards read on a worker thread, waiting to be shown by the Tk thread
+leaderboard_results = queue.Queue()
 
-def show_leaderboard():
+
+# Read the top 5 of each game's leaderboard (runs on a worker thread)
+def load_leaderboard(title, games):
+    # Imported here, off the Tk thread, so the launcher starts with Tk and PIL only
+    import sqlite3
+    from leaderboard import connect, top_scores
+
+    lines = []
     try:
-        with open("hand_detection_leaderboard.txt", "r") as file:
-            leaderboard_data = file.read()
-        
-        messagebox.showinfo("Leaderboard - Hand Detection", leaderboard_data)
-    except FileNotFoundError:
-        messagebox.showwarning("Leaderboard Not Found", "No leaderboard data found!")
+        connection = connect()
+        try:
+            for game in games:
+                unit, scores = top_scores(connection, game)
+                if len(games) > 1:
+                    lines.append(f"{game}:")
+                for position, score in enumerate(scores, start=1):
+                    lines.append(f"{position}. {score:g} {unit}")
+                if not scores:
+                    lines.append("No scores yet")
+                lines.append("")
+        finally:
+            connection.close()
+    except sqlite3.Error as error:
+        lines = [f"Could not read the leaderboard: {error}"]
+    leaderboard_results.put((title, "\n".join(lines).strip()))
+
+
+# Show the leaderboard once the worker thread has read it, without blocking the menu
+def show_leaderboard(title, games):
+    threading.Thread(target=load_leaderboard, args=(title, games), daemon=True).start()
+    window.after(20, show_leaderboard_when_ready)
+
+
+def show_leaderboard_when_ready():
+    try:
+        title, text = leaderboard_results.get_nowait()
+    except queue.Empty:
+        window.after(20, show_leaderboard_when_ready)
+        return
+    messagebox.showinfo(title, text)
 
 # Function to switch back to the theme selection view
 def show_themes():
@@ -65,13 +123,14 @@ def show_games(theme):
         play_hand_detection_btn.pack(pady=5)
 
         # Add Leaderboard button for Hand Detection game
-        leaderboard_btn = create_button("Leaderboard", show_leaderboard, game_frame)
+        leaderboard_btn = create_button("Leaderboard", lambda: show_leaderboard("Leaderboard - Hand Detection", ["hand_detection"]), game_frame)
         leaderboard_btn.pack(pady=5)
         
     elif theme == "Vocabulary":
         game_label = tk.Label(game_frame, text="Vocabulary Games", font=("Helvetica", 20, "bold"), bg="#ffffff", fg="#003366")
         game_label.pack(pady=10)
         create_button("Play missing_letter", run_game3, game_frame).pack(pady=5)
+        create_button("Leaderboard", lambda: show_leaderboard("Leaderboard - Vocabulary", ["missing_letter"]), game_frame).pack(pady=5)
     elif theme == "Fun":
         game_label = tk.Label(game_frame, text="Fun Games", font=("Helvetica", 20, "bold"), bg="#ffffff", fg="#003366")
         game_label.pack(pady=10)
@@ -79,11 +138,13 @@ def show_games(theme):
         create_button("Play filling_bar", run_game5, game_frame).pack(pady=5)
         create_button("Play music_count", run_game1, game_frame).pack(pady=5)
         create_button("Play memory_sequence", run_game6, game_frame).pack(pady=5)
+        create_button("Leaderboard", lambda: show_leaderboard("Leaderboard - Fun", ["fechar_Abrir", "music_count", "memory_sequence"]), game_frame).pack(pady=5)
     elif theme == "Co-op":
         game_label = tk.Label(game_frame, text="Co-op Games", font=("Helvetica", 20, "bold"), bg="#ffffff", fg="#003366")
         game_label.pack(pady=10)
         create_button("Play number_fingers", run_game2, game_frame).pack(pady=5)
         create_button("Play number_hands", run_game8, game_frame).pack(pady=5)
+        create_button("Leaderboard", lambda: show_leaderboard("Leaderboard - Co-op", ["number_fingers", "number_hands"]), game_frame).pack(pady=5)
 
     # Add a "Back" button to go back to the theme selection
     back_button = create_button("Back", show_themes, game_frame)
@@ -110,10 +171,16 @@ def hide_all_frames():
     theme_frame.pack_forget()
     game_frame.pack_forget()
 
+# Function to stop the game host and close the launcher
+def close_launcher():
+    host.close()
+    window.destroy()
+
 # Create the main window
 window = tk.Tk()
 window.title("Game Launcher")
 window.geometry("600x600")
+window.protocol("WM_DELETE_WINDOW", close_launcher)
 
 # Add a background image (Make sure to replace 'background.jpg' with your image file)
 bg_image = Image.open("background.jpg")
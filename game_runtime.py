@@ -0,0 +1,218 @@
+import threading
+import time
+
+import gestures
+from camera_profiles import DEFAULT_NEEDS
+from game_io import open_game_io
+from leaderboard import submit_score
+from profiling import profiler_for
+from skeleton import SkeletonRenderer
+from startup import report
+
+
+# Base class for every game. The runtime owns the frame loop: it reads the
+# newest HandFrame from the engine, lets the game update and draw on it, shows
+# it and handles the 'q' key. Games only keep their own state and rules, so the
+# same game object can run standalone or inside the long-lived game host.
+# Each run is a telemetry session; 'p' shows the performance HUD.
+# HAND_GAMES_PROFILE profiles the loop (see profiling.py).
+class GameRuntime:
+    # Plugin name used by the game host and the launcher
+    name = None
+    window_name = "Hand Detection Game"
+    max_num_hands = 2
+    flip = True
+    # Follow the hands with optical flow between Mediapipe runs (see FlowTracker)
+    flow_tracking = False
+    # Played in two halves of the screen, so --split-sides can give each half its own detector
+    two_sided = False
+    # Smallest camera frame size and rate the game needs (see camera_profiles.py)
+    camera_needs = DEFAULT_NEEDS
+    # Leaderboard scores: times, where lower is better, unless a game says otherwise
+    score_unit = "seconds"
+    lower_is_better = True
+
+    def __init__(self, engine, display, clock):
+        self.engine = engine
+        self.display = display
+        self.clock = clock
+        self.running = True
+        # Capture times of the first frame and of the frame being played. Game
+        # timers use these rather than the clock, so the time a frame spends in
+        # the pipeline is never counted in a score.
+        self.first_frame_time = None
+        self.frame_time = None
+        self.show_performance = False
+        self.preparing = None
+        self.prepare_error = None
+        self.pending_events = []  # Recorded before the first frame
+        self.skeleton = SkeletonRenderer(getattr(display, "skeleton_detail", "full"))
+
+    # Load slow assets such as sounds. Standalone games run it on a thread
+    # while the camera opens and the detector warms up.
+    def prepare(self):
+        pass
+
+    def timed_prepare(self):
+        try:
+            with report.step("assets"):
+                self.prepare()
+        except Exception as error:
+            self.prepare_error = error
+
+    def begin_prepare(self):
+        self.preparing = threading.Thread(target=self.timed_prepare, daemon=True)
+        self.preparing.start()
+
+    # Wait for prepare() (or run it now if it was never started)
+    def wait_prepared(self):
+        if self.preparing is None:
+            self.timed_prepare()
+        else:
+            self.preparing.join()
+            self.preparing = None
+        if self.prepare_error is not None:
+            error, self.prepare_error = self.prepare_error, None
+            raise error
+
+    # Set up the game state; called once before the first frame
+    def start(self):
+        pass
+
+    # Game logic and drawing for one frame; set self.running = False to end the game
+    def update(self, hand_frame):
+        raise NotImplementedError
+
+    # Called once after the loop with the last frame shown (None if no frame was read)
+    def finish(self, frame):
+        pass
+
+    # Release what prepare() and start() opened (threads, audio). Called after
+    # every run, also when the game stopped on an error or never got to start.
+    def cleanup(self):
+        pass
+
+    # Draw the skeletons of all the hands in the frame (--skeleton-detail)
+    def draw_hands(self, frame, hands):
+        self.skeleton.draw(frame, hands.points)
+
+    # Put a score on the game's leaderboard. It is written on a background
+    # thread; replays (windowed or not) and headless runs don't count.
+    def record_score(self, score, mode="default"):
+        self.record_event("score", {"score": score, "mode": mode})
+        if self.display.headless or self.is_replay():
+            return
+        submit_score(self.name, mode, score, self.lower_is_better, self.score_unit)
+
+    # Add a game event to the session recording, if the engine writes one (.hsr).
+    # Events default to the capture time of the frame being played; the ones
+    # from start() are stamped with the first frame. Games mark each new target
+    # with a "stimulus" and each answer with a "response" ({"correct": ...}),
+    # which the analytics turn into reaction times and error rates.
+    def record_event(self, kind, data=None, timestamp=None):
+        recorder = getattr(self.engine, "recorder", None)
+        if recorder is None or not hasattr(recorder, "event"):
+            return
+        if self.first_frame_time is None:
+            self.pending_events.append((kind, data))
+            return
+        recorder.event(kind, self.frame_time if timestamp is None else timestamp, data)
+
+    # Replays of videos and landmark files (.jsonl, .hsr) run on a simulated clock
+    def is_replay(self):
+        return hasattr(self.clock, "advance")
+
+    # Seconds from the first frame to the frame being played
+    def elapsed(self):
+        return self.frame_time - self.first_frame_time
+
+    def run(self):
+        self.running = True
+        self.first_frame_time = self.frame_time = None
+        self.pending_events = []
+        telemetry = getattr(self.engine, "telemetry", None)
+        if telemetry is not None:
+            telemetry.begin(self.name)
+        profiler = profiler_for(self.name)
+        if profiler is not None:
+            profiler.start()
+        recorder = getattr(self.engine, "recorder", None)
+        gesture_recorder = getattr(recorder, "gesture", None)
+        if gesture_recorder is not None:
+            gestures.subscribers.append(gesture_recorder)
+        try:
+            self.wait_prepared()
+            self.start()
+            frame = None
+            while self.running:
+                # Wait for the newest frame processed by the engine
+                hand_frame = self.engine.read()
+                if hand_frame is None:
+                    print("Error reading frame from camera")
+                    break
+                frame = hand_frame.frame
+                self.frame_time = hand_frame.timestamp
+                if self.first_frame_time is None:
+                    self.first_frame_time = self.frame_time
+                    self.record_event("start", {"game": self.name, "player": getattr(recorder, "player", None)})
+                    for kind, data in self.pending_events:
+                        self.record_event(kind, data)
+
+                started = time.perf_counter()
+                self.display.begin_frame(frame)
+                self.update(hand_frame)
+                updated = time.perf_counter()
+                if telemetry is not None:
+                    telemetry.frame(hand_frame)
+                    if self.show_performance:
+                        telemetry.draw_hud(frame)
+
+                # Display the final frame
+                self.display.show(self.window_name, frame)
+                report.first_frame()
+
+                # Check for the 'q' key to exit and 'p' for the performance HUD
+                key = self.display.wait_key(1) & 0xFF
+                if telemetry is not None:
+                    telemetry.add("update", updated - started)
+                    telemetry.add("show", time.perf_counter() - updated)
+                if profiler is not None:
+                    profiler.frame()
+                if key == ord("q"):
+                    break
+                if key == ord("p"):
+                    self.show_performance = not self.show_performance
+            self.finish(frame)
+            self.record_event("end", {"game": self.name})
+        finally:
+            self.cleanup()
+            if gesture_recorder is not None:
+                gestures.subscribers.remove(gesture_recorder)
+            if profiler is not None:
+                profiler.stop()
+            if telemetry is not None:
+                telemetry.end()
+
+
+# Run one game on its own: open the camera (or replay) from the command line,
+# play the game and close the windows. The camera opens, the detector is built
+# and warmed up and the game's assets load at the same time.
+def run_game(game_class, argv=None):
+    engine, display, clock = open_game_io(game_class.max_num_hands, game_class.flip, argv,
+                                         game_class.flow_tracking, two_sided=game_class.two_sided,
+                                         camera_needs=game_class.camera_needs)
+    game = game_class(engine, display, clock)
+    game.begin_prepare()
+    engine.start()
+
+    # Check if camera opened successfully
+    if not engine.is_opened():
+        print("Unable to open camera")
+        engine.stop()
+        return
+
+    with engine:
+        game.run()
+
+    # Close all windows
+    display.close()
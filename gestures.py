@@ -0,0 +1,155 @@
+from collections import Counter, namedtuple
+
+# One debounced gesture:
+#   kind       "opened", "closed" or "held"
+#   hand       hand index for opened/closed, None for held
+#   value      the held value (finger count, hand count...), None for opened/closed
+#   timestamp  capture time of the frame that confirmed it
+#   duration   how long the value was held (0 for opened/closed)
+GestureEvent = namedtuple("GestureEvent", ["kind", "hand", "value", "timestamp", "duration"])
+
+# Events produced so far in this process, by kind (read by the session telemetry)
+event_counts = Counter()
+# Callbacks given every event as it happens (e.g. the session recorder)
+subscribers = []
+
+
+def publish(event):
+    event_counts[event.kind] += 1
+    for subscriber in subscribers:
+        subscriber(event)
+
+
+# Last `size` values in a ring buffer with a running count per value, so
+# adding a value and asking how often one occurs are both O(1)
+class VoteWindow:
+    def __init__(self, size):
+        self.values = [None] * size
+        self.index = 0
+        self.filled = 0
+        self.counts = {}
+
+    def push(self, value):
+        if self.filled == len(self.values):
+            oldest = self.values[self.index]
+            self.counts[oldest] -= 1
+        else:
+            self.filled += 1
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.counts[value] = self.counts.get(value, 0) + 1
+
+    def count(self, value):
+        return self.counts.get(value, 0)
+
+    def clear(self):
+        self.values = [None] * len(self.values)
+        self.index = 0
+        self.filled = 0
+        self.counts = {}
+
+
+# Open/closed state of one hand with hysteresis: the state only switches once
+# `enter` of the last `window` frames agree on the other state, so a single
+# misdetected frame neither ends nor starts a closure
+class HandGesture:
+    def __init__(self, window=3, enter=2):
+        self.votes = VoteWindow(window)
+        self.enter = enter
+        self.state = None  # None until the hand has been seen long enough
+        self.last_seen = None
+
+    # Returns "opened" or "closed" when the state switches, otherwise None.
+    # Like the games always did, a close only counts after the hand was open.
+    def update(self, is_open, timestamp):
+        self.last_seen = timestamp
+        self.votes.push(is_open)
+        if self.state != "Open" and self.votes.count(True) >= self.enter:
+            self.state = "Open"
+            return "opened"
+        if self.state != "Closed" and self.votes.count(False) >= self.enter:
+            previous, self.state = self.state, "Closed"
+            if previous == "Open":
+                return "closed"
+        return None
+
+
+# Per-hand open/close events for a whole frame. Hands are tracked by their
+# index in the frame, as the games do; a hand not seen for forget_after
+# seconds starts over, so it has to open again before a close counts.
+class GestureEngine:
+    def __init__(self, window=3, enter=2, forget_after=1.0):
+        self.window = window
+        self.enter = enter
+        self.forget_after = forget_after
+        self.hands = {}
+
+    def update(self, hands, timestamp):
+        events = []
+        for hand_idx, is_open in enumerate(hands.is_open):
+            gesture = self.hands.get(hand_idx)
+            if gesture is None:
+                gesture = self.hands[hand_idx] = HandGesture(self.window, self.enter)
+            kind = gesture.update(bool(is_open), timestamp)
+            if kind is not None:
+                event = GestureEvent(kind, hand_idx, None, timestamp, 0.0)
+                events.append(event)
+                publish(event)
+
+        for hand_idx, gesture in list(self.hands.items()):
+            if timestamp - gesture.last_seen > self.forget_after:
+                del self.hands[hand_idx]
+        return events
+
+    # Debounced "Open"/"Closed" state of a hand, or None if it is not known yet
+    def state(self, hand_idx):
+        gesture = self.hands.get(hand_idx)
+        return gesture.state if gesture is not None else None
+
+    # Forget every hand, e.g. after a new question so each hand has to open again
+    def reset(self):
+        self.hands.clear()
+
+
+# Hold-to-confirm for a per-frame value such as a finger or hand count.
+# The held value only changes once `enter` of the last `window` frames show
+# a different value, so one bad frame does not restart the hold timer.
+class HoldDetector:
+    def __init__(self, hold_time, window=5, enter=3):
+        self.hold_time = hold_time
+        self.votes = VoteWindow(window)
+        self.enter = enter
+        self.value = None
+        self.since = None
+
+    # Returns a "held" event once the value has been held for hold_time;
+    # the timer then starts again for the same value
+    def update(self, value, timestamp):
+        self.votes.push(value)
+        if value != self.value and self.votes.count(value) >= self.enter:
+            self.value = value
+            self.since = timestamp
+        if self.value is None:
+            return None
+        if self.duration(timestamp) >= self.hold_time:
+            event = GestureEvent("held", None, self.value, timestamp, timestamp - self.since)
+            publish(event)
+            self.since = timestamp
+            return event
+        return None
+
+    # How long the current value has been held
+    def duration(self, timestamp):
+        if self.since is None:
+            return 0.0
+        return timestamp - self.since
+
+    # Fraction of hold_time reached (0 to 1)
+    def progress(self, timestamp):
+        return min(self.duration(timestamp) / self.hold_time, 1.0)
+
+    # Start over, e.g. after the target value changed
+    def reset(self):
+        self.votes.clear()
+        self.value = None
+        self.since = None
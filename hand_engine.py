@@ -0,0 +1,476 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from camera_profiles import DEFAULT_NEEDS, PROFILE_CACHE, open_camera, unlock_exposure
+from flow_tracker import FlowTracker
+from landmarks import classify_hands
+from preprocess import FramePreprocessor
+from split_detector import SplitDetector
+from startup import LazyModule, report
+
+mp_hands = LazyModule("mediapipe", "solutions.hands")
+
+# One processed frame handed to a game: the (flipped) BGR frame to draw on,
+# the Mediapipe results for it, the time the frame was captured (on the game
+# clock; every game timer uses it) and the hands as arrays with their
+# open/closed, finger count and side classification.
+# captured is time.perf_counter() right after the frame was read, and latency
+# the real seconds from there until the game got the frame (set by read()).
+HandFrame = namedtuple("HandFrame", ["frame", "results", "timestamp", "hands", "captured", "latency"],
+                       defaults=[None, None])
+
+
+# Monotonic clock used for timestamps and game timers when playing live, so
+# timers never jump when the system time is changed
+class SystemClock:
+    def time(self):
+        return time.monotonic()
+
+
+# Camera source wrapping cv2.VideoCapture. Opening the camera is slow on some
+# V4L2 devices, so it happens on a background thread while the detector is
+# built; the first call that needs the camera waits for it.
+# The camera is set to its cached capture profile for the needs (probed on
+# first use, see camera_profiles.py); profile_cache=None keeps the driver's defaults.
+class CameraSource:
+    def __init__(self, index=0, needs=DEFAULT_NEEDS, profile_cache=PROFILE_CACHE, reprobe=False):
+        self.cap = None
+        self.profile = None
+        self.opener = threading.Thread(target=self.open, args=(index, needs, profile_cache, reprobe), daemon=True)
+        self.opener.start()
+
+    def open(self, index, needs, profile_cache, reprobe):
+        with report.step("camera"):
+            if profile_cache is None:
+                self.cap = cv2.VideoCapture(index)
+            else:
+                self.cap, self.profile = open_camera(index, needs, profile_cache, reprobe)
+
+    def wait_opened(self):
+        if self.cap is None:
+            self.opener.join()
+
+    def is_opened(self):
+        self.wait_opened()
+        return self.cap.isOpened()
+
+    def read(self):
+        self.wait_opened()
+        return self.cap.read()
+
+    def release(self):
+        self.wait_opened()
+        if self.profile is not None and self.profile.exposure is not None:
+            unlock_exposure(self.cap)
+        self.cap.release()
+
+
+# Flip, convert and run Mediapipe on one captured frame.
+# A FramePreprocessor crops/downscales the image given to Mediapipe during
+# "convert" and maps the landmarks back to the full frame afterwards.
+# A FlowTracker moves the previous landmarks instead of running Mediapipe
+# on the frames in between its runs.
+# With a StageTimer each step is timed as its own stage.
+def process_frame(hands, frame, timestamp, flip=True, timer=None, preprocessor=None, tracker=None, captured=None):
+    start = time.perf_counter()
+
+    # Flip the camera image horizontally
+    if flip:
+        frame = cv2.flip(frame, 1)
+    flipped = time.perf_counter()
+
+    # Follow the hands with optical flow when Mediapipe is not due on this frame
+    if tracker is not None:
+        tracked = tracker.track(frame)
+        if timer is not None:
+            timer.add("flip", flipped - start)
+            timer.add("track", time.perf_counter() - flipped)
+        if tracked is not None:
+            results, hand_array = tracked
+            if preprocessor is not None:
+                preprocessor.previous_points = hand_array.points
+            return HandFrame(frame, results, timestamp, hand_array, captured)
+        flipped = time.perf_counter()
+
+    # Convert the frame to RGB for Mediapipe
+    if preprocessor is None:
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    else:
+        frame_rgb, roi = preprocessor.prepare(frame)
+    converted = time.perf_counter()
+
+    # Process the frame with Mediapipe (detectors that say so also get the capture time)
+    if getattr(hands, "timestamped", False):
+        results = hands.process(frame_rgb, timestamp)
+    else:
+        results = hands.process(frame_rgb)
+    processed = time.perf_counter()
+
+    if preprocessor is None:
+        hand_frame = HandFrame(frame, results, timestamp, classify_hands(results), captured)
+    else:
+        results, hand_array = preprocessor.restore(results, roi, frame.shape)
+        hand_frame = HandFrame(frame, results, timestamp, hand_array, captured)
+
+    if tracker is not None:
+        tracker.seed(hand_frame.results, hand_frame.hands, processed - converted)
+
+    if timer is not None:
+        if tracker is None:
+            timer.add("flip", flipped - start)
+        timer.add("convert", converted - flipped)
+        timer.add("inference", processed - converted)
+        timer.add("classify", time.perf_counter() - processed)
+    return hand_frame
+
+
+# Read one frame from the source, timed as the "read" stage
+def read_source(source, timer=None):
+    if timer is None:
+        return source.read()
+    start = time.perf_counter()
+    ret, frame = source.read()
+    timer.add("read", time.perf_counter() - start)
+    return ret, frame
+
+
+# Single-item mailbox: a new item replaces the previous one, so readers always
+# get the newest frame and stale frames are dropped ("latest-frame-wins")
+class LatestSlot:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    # Wait for an item newer than last_seq; returns (seq, item), or (last_seq, None)
+    # once the slot is closed and nothing newer is left
+    def get(self, last_seq, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > last_seq or self._closed, timeout)
+            if self._seq > last_seq:
+                return self._seq, self._item
+            return last_seq, None
+
+    # The newest item without waiting: (seq, item), or (0, None) before the first one
+    def peek(self):
+        with self._cond:
+            return self._seq, self._item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+# Capture thread: keeps reading the source so the slot always holds the newest
+# frame, stamped as soon as the read returns
+class CaptureThread(threading.Thread):
+    def __init__(self, source, slot, clock, timer=None):
+        super().__init__(daemon=True)
+        self.source = source
+        self.slot = slot
+        self.clock = clock
+        self.timer = timer
+        self.running = True
+
+    def run(self):
+        while self.running:
+            ret, frame = read_source(self.source, self.timer)
+            if not ret:
+                break
+            self.slot.put((frame, self.clock.time(), time.perf_counter()))
+        self.slot.close()
+
+
+# Inference thread: runs Mediapipe on the newest captured frame only.
+# The detector, flip and config generation are taken from the engine on every
+# frame, so a game host can reconfigure the engine while it keeps running.
+class InferenceThread(threading.Thread):
+    def __init__(self, engine, capture_slot, result_slot):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.capture_slot = capture_slot
+        self.result_slot = result_slot
+        self.running = True
+
+    def run(self):
+        engine = self.engine
+        last_seq = 0
+        try:
+            # Build the Mediapipe graph while the camera is still opening
+            engine.warm_up()
+            while self.running:
+                seq, item = self.capture_slot.get(last_seq, timeout=0.1)
+                if item is None:
+                    if self.capture_slot.closed:
+                        break
+                    continue
+                if engine.telemetry is not None and seq > last_seq + 1:
+                    engine.telemetry.dropped(seq - last_seq - 1)
+                last_seq = seq
+                frame, timestamp, captured = item
+
+                generation = engine.generation
+                # The Mediapipe graphs are built and used only on this thread
+                hands = engine.get_detector()
+                hand_frame = process_frame(hands, frame, timestamp, engine.flip, engine.timer,
+                                           engine.preprocessor, engine.active_tracker(), captured)
+                if engine.recorder is not None:
+                    engine.recorder.write(hand_frame)
+                self.result_slot.put((generation, hand_frame))
+        finally:
+            engine.close_detectors()
+            self.result_slot.close()
+
+
+# Seconds HandEngine.stop() waits for each of its threads
+STOP_TIMEOUT = 10
+
+
+# Wait up to STOP_TIMEOUT for an engine thread to exit, saying so when it takes
+# more than a second; returns whether it has exited
+def join_thread(thread, name):
+    thread.join(timeout=1)
+    if thread.is_alive():
+        print(f"Waiting for the {name} thread to finish")
+        thread.join(timeout=STOP_TIMEOUT - 1)
+    if thread.is_alive():
+        print(f"The {name} thread is still running after {STOP_TIMEOUT} s; leaving what it uses open")
+        return False
+    return True
+
+
+# Shared capture/inference engine used by every game.
+# Capture and inference run on their own threads; read() returns the newest
+# processed HandFrame, or None once the source has no more frames.
+# With threaded=False (used for replays) every frame is read and processed
+# in order on the caller's thread, so nothing is dropped and runs are repeatable.
+# max_frames ends the stream early; a StageTimer collects per-stage timings,
+# including the "frame" stage (time between two reads, i.e. one game loop)
+# and "latency" (capture until the game got the frame). A SessionTelemetry
+# also counts the frames dropped on the way and is closed with the engine.
+# configure() switches hand count and flip between games without reopening
+# the camera; detectors are cached per hand count so switching back is free.
+# inference_width and crop_to_hands make Mediapipe look at a smaller image
+# (see FramePreprocessor) and flow_tracking runs it only every few frames
+# (see FlowTracker); they are ignored for sources that carry their own
+# landmarks, since no inference runs there.
+# split_sides runs one detector on each half of the frame (see SplitDetector),
+# each with max_num_hands; cropping to the hands is skipped while it is on.
+class HandEngine:
+    def __init__(self, source=None, max_num_hands=2, min_detection_confidence=0.5, flip=True,
+                 clock=None, threaded=True, recorder=None, max_frames=None, timer=None,
+                 inference_width=None, crop_to_hands=False, flow_tracking=False, detector_factory=None,
+                 split_sides=False, telemetry=None):
+        self.source = source if source is not None else CameraSource(0)
+        self.max_num_hands = max_num_hands
+        self.min_detection_confidence = min_detection_confidence
+        self.flip = flip
+        self.clock = clock if clock is not None else SystemClock()
+        self.threaded = threaded
+        self.recorder = recorder
+        self.max_frames = max_frames
+        self.timer = timer
+        self.telemetry = telemetry
+        self.crop_to_hands = crop_to_hands
+        self.split_sides = split_sides
+        self.preprocessor = None
+        self.tracker = None
+        if not hasattr(self.source, "make_detector"):
+            if inference_width or crop_to_hands:
+                self.preprocessor = FramePreprocessor(inference_width, crop_to_hands and not split_sides,
+                                                      max_num_hands)
+            self.tracker = FlowTracker()
+        self.flow_tracking = flow_tracking
+        self.detector_factory = detector_factory
+        self.frames_read = 0
+        self.last_read_time = None
+        self.generation = 0
+        self.detectors = {}
+        self.capture_thread = None
+        self.inference_thread = None
+        self.capture_slot = None
+        self.result_slot = None
+        self.last_seq = 0
+        self.warmed_up = False
+
+    # Change the settings for the next game; frames processed with the old
+    # settings are skipped by read()
+    def configure(self, max_num_hands=None, flip=None, flow_tracking=None, split_sides=None):
+        if max_num_hands is not None:
+            self.max_num_hands = max_num_hands
+        if flip is not None:
+            self.flip = flip
+        if flow_tracking is not None:
+            self.flow_tracking = flow_tracking
+        if split_sides is not None:
+            self.split_sides = split_sides
+        if self.preprocessor is not None:
+            self.preprocessor.max_num_hands = self.max_num_hands
+            self.preprocessor.crop_to_hands = self.crop_to_hands and not self.split_sides
+            self.preprocessor.reset()
+        if self.tracker is not None:
+            self.tracker.reset()
+        self.frames_read = 0
+        self.last_read_time = None
+        self.generation += 1
+
+    # Detector for the current hand count (and split), built on first use and then reused.
+    # Sources that already carry landmarks (landmark replays) provide their own detector;
+    # a detector_factory(max_num_hands, min_detection_confidence) replaces the local
+    # Mediapipe graph, e.g. with one running in the arcade's worker processes.
+    def get_detector(self):
+        key = (self.max_num_hands, self.split_sides)
+        if key not in self.detectors:
+            make_detector = getattr(self.source, "make_detector", None)
+            if make_detector is not None:
+                detector = make_detector()
+            elif self.detector_factory is not None:
+                detector = self.detector_factory(self.max_num_hands, self.min_detection_confidence)
+            elif self.split_sides:
+                detector = SplitDetector(self.max_num_hands, self.min_detection_confidence)
+            else:
+                detector = mp_hands.Hands(
+                    static_image_mode=False,
+                    max_num_hands=self.max_num_hands,
+                    min_detection_confidence=self.min_detection_confidence,
+                )
+            self.detectors[key] = detector.__enter__()
+        return self.detectors[key]
+
+    # Build the detector and run it once on a blank frame, so the first real
+    # frame doesn't pay for building the Mediapipe graph. Runs on the thread
+    # that uses the detector; sources with their own landmarks skip it.
+    def warm_up(self, shape=(480, 640, 3)):
+        if self.warmed_up or hasattr(self.source, "make_detector"):
+            return
+        self.warmed_up = True
+        with report.step("detector"):
+            detector = self.get_detector()
+        with report.step("warm-up"):
+            detector.process(np.zeros(shape, dtype=np.uint8))
+
+    # Tracker to use on the next frame, or None while flow tracking is off
+    def active_tracker(self):
+        return self.tracker if self.flow_tracking else None
+
+    def close_detectors(self):
+        for detector in self.detectors.values():
+            detector.__exit__(None, None, None)
+        self.detectors = {}
+
+    def is_opened(self):
+        return self.source.is_opened()
+
+    def start(self):
+        if not self.threaded:
+            self.warm_up()
+            return self
+        if self.capture_thread is not None:
+            return self
+        self.capture_slot = LatestSlot()
+        self.result_slot = LatestSlot()
+        self.last_seq = 0
+        self.capture_thread = CaptureThread(self.source, self.capture_slot, self.clock, self.timer)
+        self.inference_thread = InferenceThread(self, self.capture_slot, self.result_slot)
+        self.capture_thread.start()
+        self.inference_thread.start()
+        return self
+
+    def read(self, timeout=None):
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            return None
+        if not self.threaded:
+            hand_frame = self._read_in_order()
+        else:
+            hand_frame = self._read_latest(timeout)
+        if hand_frame is not None:
+            self.frames_read += 1
+            now = time.perf_counter()
+            hand_frame = hand_frame._replace(latency=now - hand_frame.captured)
+            if self.timer is not None:
+                self.timer.add("latency", hand_frame.latency)
+                if self.last_read_time is not None:
+                    self.timer.add("frame", now - self.last_read_time)
+                self.last_read_time = now
+        return hand_frame
+
+    # Newest camera frame, not flipped and maybe not processed yet, as
+    # (seq, frame); (0, None) when the engine is not threaded or not started.
+    # The render thread shows it while inference works on an older one.
+    def latest_capture(self):
+        slot = self.capture_slot
+        if slot is None:
+            return 0, None
+        seq, item = slot.peek()
+        return seq, None if item is None else item[0]
+
+    def _read_latest(self, timeout):
+        if self.result_slot is None:
+            self.start()
+        while True:
+            seq, item = self.result_slot.get(self.last_seq, timeout)
+            if item is None:
+                return None
+            if self.telemetry is not None and seq > self.last_seq + 1:
+                self.telemetry.dropped(seq - self.last_seq - 1)
+            self.last_seq = seq
+            generation, hand_frame = item
+            if generation == self.generation:
+                return hand_frame
+
+    def _read_in_order(self):
+        ret, frame = read_source(self.source, self.timer)
+        if not ret:
+            return None
+        captured = time.perf_counter()
+        hand_frame = process_frame(self.get_detector(), frame, self.clock.time(), self.flip, self.timer,
+                                   self.preprocessor, self.active_tracker(), captured)
+        if self.recorder is not None:
+            self.recorder.write(hand_frame)
+        return hand_frame
+
+    # Stop the threads, then close the recorder and telemetry and release the
+    # source. An inference step can take seconds (the first model load), so
+    # the threads get up to STOP_TIMEOUT to finish; the recorder and source
+    # stay open while the thread using them is still running.
+    def stop(self):
+        capture_running = inference_running = False
+        if self.capture_thread is not None:
+            self.capture_thread.running = False
+            self.inference_thread.running = False
+            capture_running = not join_thread(self.capture_thread, "capture")
+            inference_running = not join_thread(self.inference_thread, "inference")
+            self.capture_thread = None
+            self.inference_thread = None
+            self.capture_slot = None
+            self.result_slot = None
+        else:
+            self.close_detectors()
+        if self.recorder is not None and not inference_running:
+            self.recorder.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if not capture_running:
+            self.source.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
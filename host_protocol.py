@@ -0,0 +1,81 @@
+import os
+import secrets
+import subprocess
+import time
+
+# Where the game host listens for the launcher
+HOST_ADDRESS = ("localhost", 6001)
+# Environment variable the launcher passes the host's authentication key in.
+# multiprocessing connections unpickle what they receive, so the key is made
+# fresh for every launch and only the host started by this launcher knows it.
+HOST_KEY_ENV = "HAND_GAMES_HOST_KEY"
+
+
+# The key a launcher gave this host process, or None; it is taken out of the
+# environment so processes started by the host don't inherit it
+def host_authkey(environ=os.environ):
+    value = environ.pop(HOST_KEY_ENV, None)
+    return bytes.fromhex(value) if value else None
+
+
+# Launcher side of the game host: starts the host process on first use and
+# asks it to play games. Only uses the standard library so the launcher stays light.
+class HostClient:
+    def __init__(self, address=HOST_ADDRESS, connect_timeout=30):
+        self.address = address
+        self.authkey = secrets.token_bytes(32)
+        self.connect_timeout = connect_timeout
+        self.process = None
+        self.connection = None
+
+    def connect(self):
+        if self.connection is not None:
+            return self.connection
+        # Imported on first use so starting the launcher stays cheap
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import Client
+
+        # No host of ours running yet: start one with our key and wait until it listens
+        if self.process is None or self.process.poll() is not None:
+            environment = dict(os.environ, **{HOST_KEY_ENV: self.authkey.hex()})
+            self.process = subprocess.Popen(['python', 'game_host.py'], env=environment)
+        deadline = time.time() + self.connect_timeout
+        while time.time() < deadline:
+            try:
+                self.connection = Client(self.address, authkey=self.authkey)
+                return self.connection
+            except AuthenticationError:
+                # Something else (an older host?) holds the port
+                print(f"Port {self.address[1]} is used by another program, not our game host")
+                return None
+            except OSError:
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.2)
+        return None
+
+    # Play a game in the host and wait until it ends.
+    # Returns False if the host could not be reached.
+    def play(self, name):
+        connection = self.connect()
+        if connection is None:
+            return False
+        try:
+            connection.send(("play", name))
+            reply = connection.recv()
+        except (OSError, EOFError):
+            self.connection = None
+            return False
+        if reply[0] == "error":
+            print(f"Game {name} failed: {reply[1]}")
+        return True
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.send(("quit",))
+                self.connection.recv()
+            except (OSError, EOFError):
+                pass
+            self.connection.close()
+            self.connection = None
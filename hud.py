@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+
+
+# One pre-rendered HUD element. The usual cv2 drawing calls are collected with
+# the box they cover, then drawn once into a colour image over black and a
+# coverage (alpha) image the size of that box. cv2.putText anti-aliases, so the
+# edges of the text are only partly covered; showing the layer blends it over
+# the box as frame * (1 - alpha) + colour, in one multiply and one add, which
+# is the blend cv2 uses itself: the frame looks the same as with the drawing
+# calls made straight onto it, anti-aliased edges included.
+class HudLayer:
+    def __init__(self, frame_shape):
+        self.frame_shape = frame_shape
+        self.calls = []
+        self.box = None  # (x0, y0, x1, y1) covering everything drawn so far
+        self.bgr = None  # Colour premultiplied by coverage (drawn over black)
+        self.inverse_alpha = None  # 255 - coverage, one value per channel
+        self.x0 = self.y0 = 0
+
+    # Grow the drawn box, with a margin for line thickness
+    def extend(self, x0, y0, x1, y1, margin):
+        box = (x0 - margin, y0 - margin, x1 + margin + 1, y1 + margin + 1)
+        if self.box is not None:
+            box = (min(box[0], self.box[0]), min(box[1], self.box[1]),
+                   max(box[2], self.box[2]), max(box[3], self.box[3]))
+        self.box = box
+
+    def text(self, text, org, scale, color, thickness):
+        (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        self.calls.append(("text", text, org, scale, color, thickness))
+        self.extend(org[0], org[1] - text_height, org[0] + text_width, org[1] + baseline, thickness)
+
+    def rectangle(self, pt1, pt2, color, thickness):
+        self.calls.append(("rectangle", pt1, pt2, color, thickness))
+        self.extend(min(pt1[0], pt2[0]), min(pt1[1], pt2[1]), max(pt1[0], pt2[0]), max(pt1[1], pt2[1]),
+                    max(thickness, 1))
+
+    # Black box with white text, as used for the numbers and letters the player chooses from
+    def boxed_text(self, text, org, scale=3, thickness=5):
+        (text_width, text_height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        self.rectangle((org[0] - 10, org[1] - text_height - 10), (org[0] + text_width + 10, org[1] + 10), (0, 0, 0), -1)
+        self.text(text, org, scale, (255, 255, 255), thickness)
+
+    # Text centred on the frame
+    def centered_text(self, text, scale, color, thickness):
+        h, w = self.frame_shape[:2]
+        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)[0]
+        self.text(text, ((w - text_size[0]) // 2, (h + text_size[1]) // 2), scale, color, thickness)
+
+    # Progress bar with its label above it
+    def progress_bar(self, x, y, width, height, value, maximum, label):
+        filled_width = int((value / maximum) * width)
+        # Draw the filled part of the bar
+        self.rectangle((x, y), (x + filled_width, y + height), (0, 255, 0), -1)
+        # Draw the outline of the bar
+        self.rectangle((x, y), (x + width, y + height), (255, 255, 255), 2)
+        # Display the current count on the bar
+        self.text(label, (x, y - 10), 0.8, (255, 255, 255), 2)
+
+    # Draw the collected calls into a canvas covering their box (cut to the frame)
+    def finish(self):
+        if self.box is None:
+            return
+        h, w = self.frame_shape[:2]
+        self.x0, self.y0 = max(self.box[0], 0), max(self.box[1], 0)
+        x1, y1 = min(self.box[2], w), min(self.box[3], h)
+        if x1 <= self.x0 or y1 <= self.y0:
+            return
+
+        size = (y1 - self.y0, x1 - self.x0)
+        self.bgr = np.zeros((*size, 3), dtype=np.uint8)
+        alpha = np.zeros(size, dtype=np.uint8)
+        for call in self.calls:
+            # Each call is drawn twice: in colour, and as coverage in the alpha image
+            if call[0] == "text":
+                _, text, (x, y), scale, color, thickness = call
+                for image, value in ((self.bgr, color), (alpha, 255)):
+                    cv2.putText(image, text, (x - self.x0, y - self.y0), cv2.FONT_HERSHEY_SIMPLEX, scale, value, thickness)
+            else:
+                _, (ax, ay), (bx, by), color, thickness = call
+                for image, value in ((self.bgr, color), (alpha, 255)):
+                    cv2.rectangle(image, (ax - self.x0, ay - self.y0), (bx - self.x0, by - self.y0), value, thickness)
+        self.inverse_alpha = cv2.merge([255 - alpha] * 3)
+        self.calls = None
+
+    def draw_on(self, frame):
+        if self.bgr is None:
+            return
+        h, w = self.bgr.shape[:2]
+        region = frame[self.y0:self.y0 + h, self.x0:self.x0 + w]
+        cv2.multiply(region, self.inverse_alpha, dst=region, scale=1 / 255)
+        cv2.add(region, self.bgr, dst=region)
+
+
+# Pre-rendered HUD layers of one game, each rendered again only when the state
+# it shows (score, numbers, word...) changes
+class HudCache:
+    def __init__(self):
+        self.layers = {}
+
+    # Draw the named layer on the frame; render(layer) is only called when
+    # state differs from the last time (or the frame size changed)
+    def draw(self, frame, name, state, render):
+        key = (state, frame.shape)
+        cached = self.layers.get(name)
+        if cached is None or cached[0] != key:
+            layer = HudLayer(frame.shape)
+            render(layer)
+            layer.finish()
+            cached = self.layers[name] = (key, layer)
+        cached[1].draw_on(frame)
+
+    # Cached black box with white text, redrawn when the text or its place changes
+    def boxed_text(self, frame, name, text, org):
+        self.draw(frame, name, (text, org), lambda layer: layer.boxed_text(text, org))
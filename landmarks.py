@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Landmark indices used by the games
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+MIDDLE_FINGER_MCP = 9
+MIDDLE_FINGER_TIP = 12
+FINGER_TIPS = np.array([8, 12, 16, 20])  # Index, Middle, Ring, Pinky (thumb handled separately)
+
+# All hands of one frame as arrays:
+#   points        (n_hands, 21, 3) normalized x, y, z
+#   is_right      (n_hands,) True for a "Right" handedness label
+#   scores        (n_hands,) handedness confidence
+#   is_open       (n_hands,) middle finger tip above its base (landmark 12 vs 9)
+#   finger_counts (n_hands,) number of raised fingers, thumb included
+#   on_left       (n_hands,) middle finger tip on the left half of the screen
+HandArray = namedtuple("HandArray", ["points", "is_right", "scores", "is_open", "finger_counts", "on_left"])
+
+
+# Convert Mediapipe results into arrays, reading each landmark only once
+def landmarks_from_results(results):
+    if not results.multi_hand_landmarks:
+        return np.zeros((0, 21, 3), dtype=np.float32), np.zeros(0, dtype=bool), np.zeros(0, dtype=np.float32)
+
+    points = np.array(
+        [[(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark] for hand_landmarks in results.multi_hand_landmarks],
+        dtype=np.float32,
+    )
+    n_hands = len(points)
+    is_right = np.ones(n_hands, dtype=bool)
+    scores = np.ones(n_hands, dtype=np.float32)
+    if results.multi_handedness:
+        for hand_idx, handedness in enumerate(results.multi_handedness[:n_hands]):
+            is_right[hand_idx] = handedness.classification[0].label == "Right"
+            scores[hand_idx] = handedness.classification[0].score
+    return points, is_right, scores
+
+
+# Open/closed for all hands: the hand is open when the middle finger tip is above its base
+def hands_open(points):
+    return points[:, MIDDLE_FINGER_TIP, 1] < points[:, MIDDLE_FINGER_MCP, 1]
+
+
+# Raised fingers for all hands: a finger is up when its tip is above the joint two
+# landmarks below it; the thumb is up when it points away from the palm
+def count_fingers(points, is_right):
+    fingers_up = points[:, FINGER_TIPS, 1] < points[:, FINGER_TIPS - 2, 1]
+    thumb_tip_x = points[:, THUMB_TIP, 0]
+    thumb_ip_x = points[:, THUMB_IP, 0]
+    thumb_up = np.where(is_right, thumb_tip_x < thumb_ip_x, thumb_tip_x > thumb_ip_x)
+    return fingers_up.sum(axis=1) + thumb_up
+
+
+# Side of the screen for all hands, judged by the middle finger tip
+def hands_on_left(points):
+    return points[:, MIDDLE_FINGER_TIP, 0] < 0.5
+
+
+# Normalized landmarks to integer pixel coordinates, shape (n_hands, 21, 2)
+def to_pixels(points, width, height):
+    return (points[:, :, :2] * np.array([width, height], dtype=np.float32)).astype(np.int32)
+
+
+# Build the HandArray from landmark arrays: every classifier in one pass
+def classify_points(points, is_right, scores):
+    return HandArray(
+        points=points,
+        is_right=is_right,
+        scores=scores,
+        is_open=hands_open(points),
+        finger_counts=count_fingers(points, is_right),
+        on_left=hands_on_left(points),
+    )
+
+
+# Build the HandArray for one frame: one conversion, then every classifier in one pass
+def classify_hands(results):
+    return classify_points(*landmarks_from_results(results))
@@ -0,0 +1,178 @@
+import atexit
+import math
+import os
+import platform
+import queue
+import sqlite3
+import threading
+import time
+
+# Leaderboard database shared by every game (and every station using the same folder)
+LEADERBOARD_DB = os.environ.get("LEADERBOARD_DB", "leaderboard.db")
+
+# Old text leaderboards, imported into the database on first use
+LEGACY_FILES = {"hand_detection": "hand_detection_leaderboard.txt"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boards (
+    game TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    lower_is_better INTEGER NOT NULL,
+    unit TEXT NOT NULL,
+    PRIMARY KEY (game, mode)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    game TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    score REAL NOT NULL,
+    station TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_board ON scores (game, mode, score);
+CREATE TABLE IF NOT EXISTS imported (
+    path TEXT PRIMARY KEY
+);
+"""
+
+
+# Open the database in WAL mode, so readers never block the writers and several
+# stations can write at once (each write waits up to `timeout` for the lock)
+def connect(path=LEADERBOARD_DB, timeout=10):
+    connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    import_legacy_files(connection)
+    return connection
+
+
+# Times in an old text leaderboard, one per line; lines that are not a time
+# (hand edits, a line cut short by a crash) are skipped
+def read_legacy_times(path):
+    times = []
+    skipped = 0
+    with open(path, errors="replace") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                time_taken = float(line)
+            except ValueError:
+                time_taken = math.nan
+            if math.isfinite(time_taken):
+                times.append(time_taken)
+            else:
+                skipped += 1
+    if skipped:
+        print(f"Skipped {skipped} lines of {path} that are not times")
+    return times
+
+
+# Import the old text leaderboards once; the check and the import share one
+# write transaction so two stations starting together don't both import
+def import_legacy_files(connection, legacy_files=LEGACY_FILES):
+    for game, path in legacy_files.items():
+        if not os.path.exists(path):
+            continue
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("SELECT 1 FROM imported WHERE path = ?", (path,)).fetchone() is None:
+                times = read_legacy_times(path)
+                add_board(connection, game, "default", True, "seconds")
+                connection.executemany(
+                    "INSERT INTO scores (game, mode, score, station, created) VALUES (?, 'default', ?, 'imported', ?)",
+                    [(game, time_taken, os.path.getmtime(path)) for time_taken in times],
+                )
+                connection.execute("INSERT INTO imported (path) VALUES (?)", (path,))
+            connection.execute("COMMIT")
+        except OSError as error:
+            # An unreadable file is tried again next time, without keeping the scores out
+            connection.execute("ROLLBACK")
+            print(f"Could not import {path}: {error}")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+
+def add_board(connection, game, mode, lower_is_better, unit):
+    connection.execute(
+        "INSERT OR IGNORE INTO boards (game, mode, lower_is_better, unit) VALUES (?, ?, ?, ?)",
+        (game, mode, int(lower_is_better), unit),
+    )
+
+
+# Store one score atomically
+def add_score(connection, game, mode, score, lower_is_better=True, unit="seconds", station=None):
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        add_board(connection, game, mode, lower_is_better, unit)
+        connection.execute(
+            "INSERT INTO scores (game, mode, score, station, created) VALUES (?, ?, ?, ?, ?)",
+            (game, mode, score, station, time.time()),
+        )
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+
+
+# Best k scores of a board, using the (game, mode, score) index.
+# Returns (unit, [scores]); unit is None for a board without scores.
+def top_scores(connection, game, mode="default", k=5):
+    board = connection.execute(
+        "SELECT lower_is_better, unit FROM boards WHERE game = ? AND mode = ?", (game, mode)
+    ).fetchone()
+    if board is None:
+        return None, []
+    order = "ASC" if board[0] else "DESC"
+    rows = connection.execute(
+        f"SELECT score FROM scores WHERE game = ? AND mode = ? ORDER BY score {order} LIMIT ?", (game, mode, k)
+    ).fetchall()
+    return board[1], [row[0] for row in rows]
+
+
+# Writes scores on its own thread, so finishing a game never waits for the disk
+class LeaderboardWriter(threading.Thread):
+    def __init__(self, path=LEADERBOARD_DB):
+        super().__init__(daemon=True)
+        self.path = path
+        self.queue = queue.Queue()
+        self.station = platform.node()
+
+    def submit(self, game, mode, score, lower_is_better=True, unit="seconds"):
+        self.queue.put((game, mode, score, lower_is_better, unit))
+
+    def run(self):
+        connection = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            # Whatever goes wrong with one score, the thread stays up for the next ones
+            try:
+                if connection is None:
+                    connection = connect(self.path)
+                add_score(connection, *item, station=self.station)
+            except Exception as error:
+                print(f"Could not save score for {item[0]}: {error}")
+        if connection is not None:
+            connection.close()
+
+    # Write what is still queued, then stop
+    def close(self, timeout=10):
+        self.queue.put(None)
+        self.join(timeout)
+
+
+writer = None
+
+
+# Queue a score for the background writer, starting it on first use
+def submit_score(game, mode, score, lower_is_better=True, unit="seconds"):
+    global writer
+    if writer is None:
+        writer = LeaderboardWriter()
+        writer.start()
+        atexit.register(writer.close)
+    writer.submit(game, mode, score, lower_is_better, unit)
@@ -0,0 +1,263 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import game_io
+import gestures
+from benchmark import GAMES, find_clip, run_game_script
+from game_runtime import GameRuntime
+from hand_engine import HandEngine
+
+# Motion-to-photon latency: how long from a player's real gesture to the game
+# showing its effect. Clips are replayed through the whole pipeline (capture,
+# flip/convert, inference, gesture logic, render) and compared with the true
+# gesture frames annotated next to the clip, in <clip name>.truth.json:
+#
+#   {"gestures": [{"frame": 57, "kind": "closed"},
+#                 {"frame": 140, "kind": "held", "value": 3}, ...]}
+#
+# kind is "closed", "opened" or "held"; "hand" and "value" are optional filters.
+# Each true gesture is matched with the first event the game scored for it
+# (a "response" for games that judge answers, else the gesture event itself)
+# before the next annotated gesture. The delay has two parts:
+#   logic     capture time from the true gesture frame to the scoring frame
+#             (debouncing, hold times, missed detections)
+#   pipeline  wall time from capturing the scoring frame to showing it
+# Replays never wait for the camera or a busy inference thread, so live play
+# adds up to a frame of queueing on top of this, and up to one --render-fps
+# interval before the render thread shows it.
+
+LATENCY_BASELINE_FILE = os.path.join("benchmarks", "latency_baseline.json")
+
+
+# Collects the frames, events and display times of one game run
+class LatencyProbe:
+    def __init__(self):
+        self.timestamps = []  # Capture time of each frame, by frame number
+        self.captured = []  # perf_counter mark of each frame's capture
+        self.shown = []  # perf_counter when each frame was shown (None if never)
+        self.events = []  # (frame, kind, hand, value)
+
+    @property
+    def frame(self):
+        return len(self.timestamps) - 1
+
+    def frame_read(self, hand_frame):
+        self.timestamps.append(hand_frame.timestamp)
+        self.captured.append(hand_frame.captured)
+        self.shown.append(None)
+
+    def gesture(self, event):
+        self.events.append((self.frame, event.kind, event.hand, event.value))
+
+    def game_event(self, kind, data):
+        if kind == "response":
+            self.events.append((self.frame, kind, None, None))
+
+    def frame_shown(self):
+        if self.timestamps and self.shown[-1] is None:
+            self.shown[-1] = time.perf_counter()
+
+
+# Feed the probe for the duration of one run: engine reads, gesture events,
+# the game's recorded events and the frames reaching the display
+@contextlib.contextmanager
+def probed(probe):
+    original_read = HandEngine.read
+    original_record_event = GameRuntime.record_event
+    original_shows = [(display_class, display_class.show)
+                      for display_class in (game_io.WindowDisplay, game_io.HeadlessDisplay)]
+
+    def read(engine, *args, **kwargs):
+        hand_frame = original_read(engine, *args, **kwargs)
+        if hand_frame is not None:
+            probe.frame_read(hand_frame)
+        return hand_frame
+
+    def record_event(game, kind, data=None, timestamp=None):
+        probe.game_event(kind, data)
+        return original_record_event(game, kind, data, timestamp)
+
+    def wrap_show(show):
+        def probed_show(display, window_name, frame):
+            result = show(display, window_name, frame)
+            probe.frame_shown()
+            return result
+        return probed_show
+
+    HandEngine.read = read
+    GameRuntime.record_event = record_event
+    for display_class, show in original_shows:
+        display_class.show = wrap_show(show)
+    gestures.subscribers.append(probe.gesture)
+    try:
+        yield
+    finally:
+        gestures.subscribers.remove(probe.gesture)
+        HandEngine.read = original_read
+        GameRuntime.record_event = original_record_event
+        for display_class, show in original_shows:
+            display_class.show = show
+
+
+# Annotated true gestures for a clip, or None when it has none
+def load_truth(clip):
+    path = os.path.splitext(clip)[0] + ".truth.json"
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)["gestures"]
+
+
+# Match each true gesture with the frame the game scored it on (None if it never did)
+def match_gestures(truth, events):
+    truth = sorted(truth, key=lambda gesture: gesture["frame"])
+    scores_answers = any(kind == "response" for _, kind, _, _ in events)
+    matches = []
+    for idx, gesture in enumerate(truth):
+        first = gesture["frame"]
+        last = truth[idx + 1]["frame"] if idx + 1 < len(truth) else float("inf")
+        detected = scored = None
+        for frame, kind, hand, value in events:
+            if not first <= frame < last:
+                continue
+            if detected is None and kind == gesture["kind"] \
+                    and gesture.get("hand", hand) == hand and gesture.get("value", value) == value:
+                detected = frame
+            if scored is None and kind == "response":
+                scored = frame
+        matches.append((gesture, detected, scored if scores_answers else detected))
+    return matches
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = np.array(values)
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "max": float(values.max()),
+    }
+
+
+# Replay one game over an annotated clip and measure every true gesture's delay
+def measure_game(game, clip, truth, seed=0, game_args=()):
+    probe = LatencyProbe()
+    with probed(probe):
+        run_game_script(game, clip, seed, game_args=game_args)
+
+    gestures_report = []
+    for gesture, detected, scored in match_gestures(truth, probe.events):
+        entry = {"frame": gesture["frame"], "kind": gesture["kind"], "detected_frame": detected,
+                 "scored_frame": scored}
+        if scored is not None and gesture["frame"] < len(probe.timestamps) and probe.shown[scored] is not None:
+            logic_ms = (probe.timestamps[scored] - probe.timestamps[gesture["frame"]]) * 1000
+            pipeline_ms = (probe.shown[scored] - probe.captured[scored]) * 1000
+            entry.update(delay_frames=scored - gesture["frame"], logic_ms=logic_ms,
+                         pipeline_ms=pipeline_ms, total_ms=logic_ms + pipeline_ms)
+        gestures_report.append(entry)
+
+    measured = [entry for entry in gestures_report if "total_ms" in entry]
+    return {
+        "clip": clip,
+        "frames": len(probe.timestamps),
+        "gestures": len(gestures_report),
+        "missed": len(gestures_report) - len(measured),
+        "delay_frames": percentiles([entry["delay_frames"] for entry in measured]),
+        "logic_ms": percentiles([entry["logic_ms"] for entry in measured]),
+        "pipeline_ms": percentiles([entry["pipeline_ms"] for entry in measured]),
+        "total_ms": percentiles([entry["total_ms"] for entry in measured]),
+        "per_gesture": gestures_report,
+    }
+
+
+def print_report(results):
+    print(f"{'game':<22}{'gestures':>9}{'missed':>7}{'frames p50':>11}{'logic p50':>11}"
+          f"{'pipeline p50':>13}{'total p50':>11}{'total p95':>11}")
+    for game, result in results.items():
+        if "error" in result:
+            print(f"{game:<22}  {result['error']}")
+            continue
+        if result["total_ms"] is None:
+            print(f"{game:<22}{result['gestures']:>9}{result['missed']:>7}  no gesture was scored")
+            continue
+        print(f"{game:<22}{result['gestures']:>9}{result['missed']:>7}{result['delay_frames']['p50']:>11.1f}"
+              f"{result['logic_ms']['p50']:>9.1f}ms{result['pipeline_ms']['p50']:>11.2f}ms"
+              f"{result['total_ms']['p50']:>9.1f}ms{result['total_ms']['p95']:>9.1f}ms")
+
+
+# Compare with a stored run; returns a list of regression messages
+def find_regressions(results, baseline, tolerance, min_delta_ms=1.0):
+    regressions = []
+    for game, result in results.items():
+        base = baseline.get(game)
+        if base is None or result.get("total_ms") is None or base.get("total_ms") is None:
+            continue
+        if result["missed"] > base["missed"]:
+            regressions.append(f"{game}: {result['missed']} gestures missed, baseline {base['missed']}")
+        current, previous = result["total_ms"]["p95"], base["total_ms"]["p95"]
+        if current > previous * (1 + tolerance) and current - previous > min_delta_ms:
+            regressions.append(f"{game}: total p95 {current:.1f} ms > baseline {previous:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion-to-photon latency of the games over annotated clips")
+    parser.add_argument("--games", nargs="+", default=GAMES, help="game scripts to run")
+    parser.add_argument("--clips-dir", default=os.path.join("benchmarks", "clips"),
+                        help="folder with <game>.* or default.* clips and their .truth.json annotations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=LATENCY_BASELINE_FILE, help="baseline file to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--output", help="also write the full report, with every gesture, as JSON to this file")
+    # Options this tool does not know are passed on to the games
+    args, game_args = parser.parse_known_args()
+
+    results = {}
+    for game in args.games:
+        clip = find_clip(args.clips_dir, game, landmarks=True)
+        truth = load_truth(clip) if clip is not None else None
+        if truth is None:
+            results[game] = {"error": f"no annotated clip in {args.clips_dir}"}
+            continue
+        try:
+            results[game] = measure_game(game, clip, truth, args.seed, game_args)
+        except Exception as error:
+            results[game] = {"error": f"{type(error).__name__}: {error}"}
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
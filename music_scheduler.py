@@ -0,0 +1,86 @@
+import bisect
+import threading
+
+from startup import LazyModule
+
+pygame = LazyModule("pygame")
+
+
+# Plays and pauses the music on its own timeline, away from the frame loop, and
+# keeps the time of every change so a gesture can be judged against the music
+# state at the moment its frame was captured (playing_at), not when it was processed.
+# next_interval() gives the time until the next change. With the wall clock a
+# thread makes each change on time; simulated clocks (replays) don't run on
+# their own, so there the changes happen when poll() is called, at their
+# scheduled times. on_change(timestamp, playing) is told about every change.
+class MusicScheduler(threading.Thread):
+    def __init__(self, clock, next_interval, on_change=None):
+        super().__init__(daemon=True)
+        self.clock = clock
+        self.next_interval = next_interval
+        self.on_change = on_change
+        self.live = not hasattr(clock, "advance")
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.change_times = []  # When the music started or paused
+        self.states = []  # True when it started playing at that time
+        self.next_change = None
+
+    # Start the music and its timeline
+    def begin(self):
+        pygame.mixer.music.play()
+        now = self.clock.time()
+        with self.lock:
+            self.record(now, True)
+            self.next_change = now + self.next_interval()
+        if self.live:
+            self.start()
+
+    def record(self, timestamp, playing):
+        self.change_times.append(timestamp)
+        self.states.append(playing)
+        if self.on_change is not None:
+            self.on_change(timestamp, playing)
+
+    def run(self):
+        while not self.stopped.wait(max(self.next_change - self.clock.time(), 0)):
+            self.poll(self.clock.time())
+
+    # Make every change due by now
+    def poll(self, now):
+        with self.lock:
+            while self.next_change is not None and now >= self.next_change:
+                playing = not self.states[-1]
+                if playing:
+                    pygame.mixer.music.unpause()
+                else:
+                    pygame.mixer.music.pause()
+                # Live, the change happened when the mixer call returned
+                self.record(self.clock.time() if self.live else self.next_change, playing)
+                self.next_change += self.next_interval()
+
+    @property
+    def playing(self):
+        with self.lock:
+            return bool(self.states) and self.states[-1]
+
+    # Whether the music was playing at this (capture) time
+    def playing_at(self, timestamp):
+        with self.lock:
+            idx = bisect.bisect_right(self.change_times, timestamp) - 1
+            return idx >= 0 and self.states[idx]
+
+    # Total time the music has played up to now
+    def played_time(self, now):
+        with self.lock:
+            played = 0.0
+            for idx, (change_time, playing) in enumerate(zip(self.change_times, self.states)):
+                if playing:
+                    end = self.change_times[idx + 1] if idx + 1 < len(self.change_times) else now
+                    played += max(min(end, now) - change_time, 0.0)
+            return played
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join(timeout=1)
@@ -1,48 +1,28 @@
 import cv2
-import mediapipe as mp
 import random
-import time
-import math
-
-# Initialize Mediapipe
-mp_drawing = mp.solutions.drawing_utils
-mp_hands = mp.solutions.hands
-
-# Initialize video capture
-cap = cv2.VideoCapture(0)
-
-# Check if camera opened successfully
-if not cap.isOpened():
-    print("Unable to open camera")
-    exit()
-
-# Initialize variables
-correct_detection_count = 0
-max_detections = 10  # Number of correct hand detections required
-current_number = random.randint(1, 4)  # Random number between 1 and 4
-previous_number = current_number
-start_time = time.time()  # Start time to track total duration
-correct_time_threshold = 2  # 2 seconds required to hold correct hand count
-detected_hands_start_time = None  # Time when correct number of hands first detected
-progress = 0  # Progress for the circle (0 to 100)
-
-# Modify this to detect more hands (up to 4 hands)
-with mp_hands.Hands(static_image_mode=False, max_num_hands=4, min_detection_confidence=0.5) as hands:
-    while True:
-        # Read the frame from the video capture
-        ret, frame = cap.read()
-        if not ret:
-            print("Error reading frame from camera")
-            break
-
-        # Flip the camera image horizontally
-        flipped_frame = cv2.flip(frame, 1)
-
-        # Convert the frame to RGB for Mediapipe
-        frame_rgb = cv2.cvtColor(flipped_frame, cv2.COLOR_BGR2RGB)
-
-        # Process the frame with Mediapipe
-        results = hands.process(frame_rgb)
+from game_runtime import GameRuntime, run_game
+from gestures import HoldDetector
+
+
+# Show the number of hands on screen and hold them for 2 seconds
+class NumberHandsGame(GameRuntime):
+    name = "number_hands"
+    window_name = "Hand Detection Game"
+    max_num_hands = 4  # Modify this to detect more hands (up to 4 hands)
+
+    def start(self):
+        # Initialize variables
+        self.correct_detection_count = 0
+        self.max_detections = 10  # Number of correct hand detections required
+        self.current_number = random.randint(1, 4)  # Random number between 1 and 4
+        self.record_event("stimulus", {"target": self.current_number})
+        self.answer = None  # Last value answered for the current number
+        self.correct_time_threshold = 2  # 2 seconds required to hold correct hand count
+        self.hand_hold = HoldDetector(self.correct_time_threshold)  # How long the hand count has been held
+        self.progress = 0  # Progress for the circle (0 to 100)
+
+    def update(self, hand_frame):
+        flipped_frame, results, hands = hand_frame.frame, hand_frame.results, hand_frame.hands
 
         # Get frame dimensions
         h, w, _ = flipped_frame.shape
@@ -50,44 +30,37 @@ with mp_hands.Hands(static_image_mode=False, max_num_hands=4, min_detection_conf
         # Count the number of detected hands
         hand_count = 0
         if results.multi_hand_landmarks:
-            hand_count = len(results.multi_hand_landmarks)
-            for hand_landmarks in results.multi_hand_landmarks:
-                # Draw the hand landmarks on the flipped frame
-                mp_drawing.draw_landmarks(
-                    flipped_frame, 
-                    hand_landmarks, 
-                    mp_hands.HAND_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=4),
-                    mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2)
-                )
-
-        # Detect if the correct number of hands is shown for the required duration
-        if hand_count == current_number:
-            if detected_hands_start_time is None:
-                detected_hands_start_time = time.time()  # Start counting if first time detection
-            else:
-                elapsed_time = time.time() - detected_hands_start_time
-                progress = min((elapsed_time / correct_time_threshold) * 100, 100)  # Update progress
-                
-                if elapsed_time >= correct_time_threshold:
-                    # Successfully held for 2 seconds, move to next number
-                    correct_detection_count += 1
-                    print(f"Correct! Total Correct Detections: {correct_detection_count}")
-                    
-                    # Reset for next round
-                    detected_hands_start_time = None
-                    progress = 0  # Reset progress
-
-                    # Generate a new number between 1 and 4, ensuring it's not the same as the previous
-                    while True:
-                        new_number = random.randint(1, 4)
-                        if new_number != current_number:
-                            current_number = new_number
-                            break
+            hand_count = len(hands.points)
+        self.draw_hands(flipped_frame, hands)
+
+        # Detect if the correct number of hands is shown for the required duration;
+        # a hand missed for a frame does not restart the timer. No hands in
+        # view is no answer, so an idle player never holds one.
+        held = self.hand_hold.update(hand_count if hand_count > 0 else None, hand_frame.timestamp)
+        # An answer is recorded once, not again every 2 seconds it stays held
+        if held is not None and held.value != self.answer:
+            self.answer = held.value
+            self.record_event("response", {"correct": held.value == self.current_number,
+                                           "value": held.value, "duration": held.duration})
+        if held is not None and held.value == self.current_number:
+            # Successfully held for 2 seconds, move to next number
+            self.correct_detection_count += 1
+            print(f"Correct! Total Correct Detections: {self.correct_detection_count}")
+
+            # Generate a new number between 1 and 4, ensuring it's not the same as the previous
+            while True:
+                new_number = random.randint(1, 4)
+                if new_number != self.current_number:
+                    self.current_number = new_number
+                    break
+            self.answer = None
+            self.record_event("stimulus", {"target": self.current_number})
+
+        # Fill the circle while the correct count is held
+        if self.hand_hold.value == self.current_number:
+            self.progress = self.hand_hold.progress(hand_frame.timestamp) * 100
         else:
-            # Reset if incorrect hand count detected
-            detected_hands_start_time = None
-            progress = 0  # Reset progress
+            self.progress = 0
 
         # Draw the progress bar and numbers on the flipped frame
         bar_x, bar_y = 10, 100  # Starting position of the bar
@@ -95,7 +68,7 @@ with mp_hands.Hands(static_image_mode=False, max_num_hands=4, min_detection_conf
         bar_height = 30  # Height of the bar
 
         # Calculate how much of the bar should be filled based on the correct_detection_count
-        filled_width = int((correct_detection_count / max_detections) * bar_width)
+        filled_width = int((self.correct_detection_count / self.max_detections) * bar_width)
 
         # Draw the filled part of the bar
         cv2.rectangle(flipped_frame, (bar_x, bar_y), (bar_x + filled_width, bar_y + bar_height), (0, 255, 0), -1)
@@ -103,45 +76,43 @@ with mp_hands.Hands(static_image_mode=False, max_num_hands=4, min_detection_conf
         cv2.rectangle(flipped_frame, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (255, 255, 255), 2)
 
         # Display the current count on the bar
-        cv2.putText(flipped_frame, f"Correct Detections: {correct_detection_count}/{max_detections}", 
+        cv2.putText(flipped_frame, f"Correct Detections: {self.correct_detection_count}/{self.max_detections}",
                     (bar_x, bar_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
 
         # Display the current number in the center of the screen
-        (text_width, text_height), _ = cv2.getTextSize(f"{current_number}", cv2.FONT_HERSHEY_SIMPLEX, 4, 5)
+        (text_width, text_height), _ = cv2.getTextSize(f"{self.current_number}", cv2.FONT_HERSHEY_SIMPLEX, 4, 5)
         number_x = (w - text_width) // 2
         number_y = (h + text_height) // 2
-        cv2.putText(flipped_frame, f"{current_number}", (number_x, number_y), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 5)
+        cv2.putText(flipped_frame, f"{self.current_number}", (number_x, number_y), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 5)
 
         # Draw a progress circle around the number
         radius = 100  # Radius of the circle
         circle_center = (number_x + text_width // 2, number_y - text_height // 2)
-        angle = int(progress * 3.6)  # Convert progress (0-100) to angle (0-360)
+        angle = int(self.progress * 3.6)  # Convert progress (0-100) to angle (0-360)
 
         # Draw the circular progress
         cv2.ellipse(flipped_frame, circle_center, (radius, radius), -90, 0, angle, (0, 255, 0), 10)
 
-        # Display the final frame
-        cv2.imshow("Hand Detection Game", flipped_frame)
-
-        # Check for the 'q' key to exit
-        if cv2.waitKey(1) == ord("q"):
-            break
-
         # Check if the target has been reached
-        if correct_detection_count >= max_detections:
-            end_time = time.time()  # End time
-            total_time = end_time - start_time  # Calculate total time
-            print(f"You've reached the goal! Total Time: {total_time:.2f} seconds")
-            
-            # Display the success message and time on the final frame with smaller font size
-            cv2.putText(flipped_frame, "You've reached the goal!", 
-                        (50, h - 100), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)  # Smaller font size
-            cv2.putText(flipped_frame, f"Time taken: {total_time:.2f} seconds", 
-                        (50, h - 50), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)  # Smaller font size
-            cv2.imshow("Hand Detection Game", flipped_frame)
-            cv2.waitKey(0)  # Wait for a key press to exit
-            break
-
-# Release the video capture and close all windows
-cap.release()
-cv2.destroyAllWindows()
+        if self.correct_detection_count >= self.max_detections:
+            self.running = False
+
+    def finish(self, frame):
+        if self.correct_detection_count < self.max_detections:
+            return
+        total_time = self.elapsed()  # From the first frame to the one that completed the game
+        print(f"You've reached the goal! Total Time: {total_time:.2f} seconds")
+        self.record_score(total_time)
+
+        # Display the success message and time on the final frame with smaller font size
+        h = frame.shape[0]
+        cv2.putText(frame, "You've reached the goal!",
+                    (50, h - 100), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)  # Smaller font size
+        cv2.putText(frame, f"Time taken: {total_time:.2f} seconds",
+                    (50, h - 50), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)  # Smaller font size
+        self.display.show(self.window_name, frame)
+        self.display.wait_key(0)  # Wait for a key press to exit
+
+
+if __name__ == "__main__":
+    run_game(NumberHandsGame)
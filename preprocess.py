@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+
+from landmarks import classify_points, landmarks_from_results
+from replay import Landmark, LandmarkList, ReplayResults
+
+
+# Build Mediapipe-like results from full-frame landmark arrays, keeping the handedness as detected
+def results_from_points(points, multi_handedness):
+    hand_landmarks = [LandmarkList([Landmark(*point) for point in hand.tolist()]) for hand in points]
+    return ReplayResults(hand_landmarks, multi_handedness)
+
+
+# Shrinks what Mediapipe has to look at before inference:
+#   inference_width  downscale the image so it is at most this wide (None keeps the camera size)
+#   crop_to_hands    once hands are tracked, only give Mediapipe a padded square around
+#                    the union of the previous frame's hands
+# The crop is kept while the hands stay well inside it, so Mediapipe's own tracking
+# sees a stable image. It falls back to the full frame when the hands are lost, and
+# every full_frame_interval frames while fewer hands than allowed are tracked, so new
+# hands entering the picture are still found. Landmarks found in a crop are mapped back
+# to full-frame coordinates, so games never see the difference.
+class FramePreprocessor:
+    def __init__(self, inference_width=None, crop_to_hands=False, max_num_hands=2, padding=0.5,
+                 min_crop_size=0.35, full_frame_interval=15):
+        self.max_num_hands = max_num_hands
+        self.inference_width = inference_width
+        self.crop_to_hands = crop_to_hands
+        self.padding = padding
+        self.min_crop_size = min_crop_size
+        self.full_frame_interval = full_frame_interval
+        self.reset()
+
+    # Forget the tracked hands, e.g. when a new game starts
+    def reset(self):
+        self.previous_points = None
+        self.roi = None
+        self.frames_since_full = 0
+
+    # Padded square (x0, y0, x1, y1) in pixels around the union of the hands' bounding boxes,
+    # cut down to the frame where it does not fit
+    def hand_roi(self, points, width, height):
+        xy = points[:, :, :2].reshape(-1, 2) * np.array([width, height], dtype=np.float32)
+        x_min, y_min = xy.min(axis=0)
+        x_max, y_max = xy.max(axis=0)
+        side = max(x_max - x_min, y_max - y_min) * (1 + 2 * self.padding)
+        side = max(side, self.min_crop_size * min(width, height))
+        crop_width, crop_height = int(min(side, width)), int(min(side, height))
+        center_x, center_y = (x_min + x_max) / 2, (y_min + y_max) / 2
+        x0 = int(np.clip(center_x - crop_width / 2, 0, width - crop_width))
+        y0 = int(np.clip(center_y - crop_height / 2, 0, height - crop_height))
+        return x0, y0, x0 + crop_width, y0 + crop_height
+
+    # True while every hand stays inside the inner part of the current crop
+    def roi_still_fits(self, points, width, height):
+        x0, y0, x1, y1 = self.roi
+        margin = (x1 - x0) * self.padding / (2 * (1 + 2 * self.padding))
+        xy = points[:, :, :2].reshape(-1, 2) * np.array([width, height], dtype=np.float32)
+        return (xy[:, 0].min() >= x0 + margin and xy[:, 0].max() <= x1 - margin and
+                xy[:, 1].min() >= y0 + margin and xy[:, 1].max() <= y1 - margin)
+
+    # Pick the region of the (flipped, BGR) frame to run on this time, or None for the full frame
+    def choose_roi(self, frame_shape):
+        height, width = frame_shape[:2]
+        points = self.previous_points
+        if not self.crop_to_hands or points is None or len(points) == 0:
+            self.roi = None
+        elif len(points) < self.max_num_hands and self.frames_since_full >= self.full_frame_interval:
+            self.roi = None  # Look at the whole picture now and then for new hands
+        elif self.roi is None or not self.roi_still_fits(points, width, height):
+            self.roi = self.hand_roi(points, width, height)
+        if self.roi is None:
+            self.frames_since_full = 0
+        else:
+            self.frames_since_full += 1
+        return self.roi
+
+    # Crop, downscale and convert the frame to the RGB image given to Mediapipe.
+    # Returns (image, roi).
+    def prepare(self, frame):
+        roi = self.choose_roi(frame.shape)
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            frame = frame[y0:y1, x0:x1]
+        if self.inference_width and frame.shape[1] > self.inference_width:
+            scale = self.inference_width / frame.shape[1]
+            frame = cv2.resize(frame, (self.inference_width, max(1, round(frame.shape[0] * scale))),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), roi
+
+    # Map the landmarks found in the crop back to the full frame and remember
+    # where the hands are for the next frame. Returns (results, hands).
+    def restore(self, results, roi, frame_shape):
+        points, is_right, scores = landmarks_from_results(results)
+        if roi is not None and len(points):
+            height, width = frame_shape[:2]
+            x0, y0, x1, y1 = roi
+            crop_width, crop_height = x1 - x0, y1 - y0
+            points[:, :, 0] = (x0 + points[:, :, 0] * crop_width) / width
+            points[:, :, 1] = (y0 + points[:, :, 1] * crop_height) / height
+            points[:, :, 2] *= crop_width / width
+            results = results_from_points(points, results.multi_handedness)
+        self.previous_points = points
+        return results, classify_points(points, is_right, scores)
@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# HAND_GAMES_PROFILE=MODE[:GAME,GAME...] profiles the games' frame loops without editing them:
+#   cprofile  deterministic cProfile stats (.prof and a .txt summary)
+#   sample    a sampling profiler only, cheap enough to leave the timings almost untouched
+# Both modes also sample the stacks for a flamegraph (.collapsed, for flamegraph.pl
+# or speedscope). Without a game list every game is profiled.
+PROFILE_ENV = "HAND_GAMES_PROFILE"
+# Frames to profile before the files are written (the game keeps running)
+PROFILE_FRAMES_ENV = "HAND_GAMES_PROFILE_FRAMES"
+# Folder for the profiles, named <game>_<date>-<time>
+PROFILE_DIR_ENV = "HAND_GAMES_PROFILE_DIR"
+
+MODES = ("cprofile", "sample")
+
+
+# Collects the main thread's stack every interval seconds from a background thread
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join(timeout=1)
+
+
+# Profiles one game's frame loop for a bounded number of frames
+class GameProfiler:
+    def __init__(self, game, mode, max_frames=300, directory="profiles"):
+        self.game = game
+        self.mode = mode
+        self.max_frames = max_frames
+        self.directory = directory
+        self.frames = 0
+        self.profile = None
+        self.sampler = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.sampler = StackSampler(threading.get_ident())
+        self.sampler.start()
+        if self.mode == "cprofile":
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    # Count one frame; the profile is written once max_frames were played
+    def frame(self):
+        if self.sampler is None:
+            return
+        self.frames += 1
+        if self.frames >= self.max_frames:
+            self.stop()
+
+    # Stop profiling and write the files (also when the game ends early)
+    def stop(self):
+        if self.sampler is None:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        self.sampler.stop()
+        seconds = time.perf_counter() - self.started
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{self.game}_{time.strftime('%Y%m%d-%H%M%S')}")
+        with open(base + ".collapsed", "w") as file:
+            for stack, count in self.sampler.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        with open(base + ".txt", "w") as file:
+            file.write(f"{self.game}: {self.frames} frames in {seconds:.2f} s ({self.mode})\n\n")
+            if self.profile is not None:
+                import pstats
+                self.profile.dump_stats(base + ".prof")
+                stats = pstats.Stats(self.profile, stream=file)
+                stats.sort_stats("cumulative").print_stats(40)
+            else:
+                self.write_sample_summary(file)
+        print(f"Profile of {self.game} written to {base}.*")
+        self.sampler = None
+        self.profile = None
+
+    # Functions by samples spent in them (self) and under them (total)
+    def write_sample_summary(self, file):
+        own, total = Counter(), Counter()
+        for stack, count in self.sampler.stacks.items():
+            functions = stack.split(";")
+            own[functions[-1]] += count
+            for function in set(functions):
+                total[function] += count
+        samples = max(sum(self.sampler.stacks.values()), 1)
+        file.write(f"{'self %':>8}{'total %':>9}  function\n")
+        for function, count in own.most_common(40):
+            file.write(f"{100 * count / samples:8.1f}{100 * total[function] / samples:9.1f}  {function}\n")
+
+
+# Profiler for this game as asked for in the environment, or None
+def profiler_for(game, environ=os.environ):
+    setting = environ.get(PROFILE_ENV)
+    if not setting:
+        return None
+    mode, _, games = setting.partition(":")
+    if mode not in MODES:
+        print(f"Unknown {PROFILE_ENV} mode {mode!r} (choose from {', '.join(MODES)})")
+        return None
+    if games and game not in games.split(","):
+        return None
+    max_frames = int(environ.get(PROFILE_FRAMES_ENV, 300))
+    return GameProfiler(game, mode, max_frames, environ.get(PROFILE_DIR_ENV, "profiles"))
@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Window drawn by its own thread at a steady rate, independent of hand detection.
+# The game loop only runs as often as inference gives it a new frame (10-15 fps
+# on slow machines); the render thread keeps showing the newest camera frame with
+# the game's latest drawing on top (skeletons, HUD, texts), so the camera image
+# stays smooth. Keys pressed in the window reach the game through a queue.
+# Every window call (imshow, waitKey, destroyAllWindows) is made on the render
+# thread, as the GUI backends want them all on one thread.
+
+SUM_CHANNELS = np.ones((1, 3), dtype=np.float32)
+
+
+# What a game drew on a camera frame: the pixels where its frame differs from
+# the camera image. When it covers most of the frame (end screens on a plain
+# background) the game's frame is shown as it is instead of the camera.
+class Overlay:
+    def __init__(self, camera, frame):
+        self.frame = frame.copy()
+        self.mask = None
+        if camera is None or camera.shape != frame.shape:
+            return
+        # Sum of the channel differences, saturated: non-zero where any channel changed
+        self.mask = cv2.transform(cv2.absdiff(frame, camera), SUM_CHANNELS)
+        if cv2.countNonZero(self.mask) * 2 > self.mask.size:
+            self.mask = None
+
+    # The overlay drawn on a newer camera image (changed in place)
+    def apply(self, camera):
+        if self.mask is None or camera.shape != self.frame.shape:
+            return self.frame
+        return cv2.copyTo(self.frame, self.mask, camera)
+
+
+# Shows engine.latest_capture() with the latest overlay, at most fps times a
+# second and only when one of them changed, and polls the keyboard every turn
+class RenderThread(threading.Thread):
+    def __init__(self, engine, fps, timer=None):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.interval = 1 / fps
+        self.timer = timer
+        self.keys = queue.Queue()
+        self.lock = threading.Lock()
+        self.window_name = None
+        self.overlay = None
+        self.overlay_seq = 0
+        self.running = True
+
+    def post(self, window_name, overlay):
+        with self.lock:
+            self.window_name = window_name
+            self.overlay = overlay
+            self.overlay_seq += 1
+
+    def run(self):
+        shown = (0, 0)  # (camera seq, overlay seq) on screen
+        next_time = time.perf_counter()
+        while self.running:
+            with self.lock:
+                window_name, overlay, overlay_seq = self.window_name, self.overlay, self.overlay_seq
+            camera_seq, camera = self.engine.latest_capture()
+            if overlay is not None and (camera_seq, overlay_seq) != shown:
+                started = time.perf_counter()
+                if camera is not None:
+                    camera = cv2.flip(camera, 1) if self.engine.flip else camera.copy()
+                    image = overlay.apply(camera)
+                else:
+                    image = overlay.frame
+                cv2.imshow(window_name, image)
+                shown = (camera_seq, overlay_seq)
+                if self.timer is not None:
+                    self.timer.add("render", time.perf_counter() - started)
+
+            key = cv2.waitKey(1)
+            if key != -1:
+                self.keys.put(key)
+
+            # Frame pacing: sleep to the next tick, or start again from now when late
+            next_time += self.interval
+            now = time.perf_counter()
+            if next_time > now:
+                time.sleep(next_time - now)
+            else:
+                next_time = now
+        cv2.destroyAllWindows()
+
+
+# On-screen window drawn by a RenderThread (--render-fps). The game calls
+# begin_frame() with the camera frame before drawing on it, show() with the
+# finished frame, and reads the keys with wait_key() as from cv2.waitKey.
+class RenderedDisplay:
+    headless = False
+    skeleton_detail = "full"
+
+    def __init__(self, engine, fps, timer=None):
+        self.engine = engine
+        self.fps = fps
+        self.timer = timer
+        self.thread = None
+        self.camera = None
+
+    def begin_frame(self, frame):
+        self.camera = frame.copy()
+
+    def show(self, window_name, frame):
+        if self.thread is None:
+            self.thread = RenderThread(self.engine, self.fps, self.timer)
+            self.thread.start()
+        self.thread.post(window_name, Overlay(self.camera, frame))
+
+    # Next key pressed, or -1 after delay ms; a delay <= 0 waits for a key
+    # (or until the render thread is gone)
+    def wait_key(self, delay=1):
+        if self.thread is None:
+            return -1
+        deadline = None if delay <= 0 else time.perf_counter() + delay / 1000
+        while self.thread.is_alive():
+            timeout = 0.1 if deadline is None else deadline - time.perf_counter()
+            try:
+                return self.thread.keys.get(timeout=max(timeout, 0))
+            except queue.Empty:
+                if deadline is not None:
+                    return -1
+        return -1
+
+    def close(self):
+        if self.thread is not None:
+            self.thread.running = False
+            self.thread.join(timeout=1)
+            self.thread = None
+        self.camera = None
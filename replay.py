@@ -0,0 +1,148 @@
+import json
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Lightweight stand-ins for the Mediapipe result objects, with the same
+# attribute layout the games read (results.multi_hand_landmarks[i].landmark[j].x, ...)
+class Landmark(namedtuple("Landmark", ["x", "y", "z"])):
+    __slots__ = ()
+
+    # Mediapipe's drawing utils ask landmarks whether visibility/presence are set
+    def HasField(self, name):
+        return False
+
+
+LandmarkList = namedtuple("LandmarkList", ["landmark"])
+Classification = namedtuple("Classification", ["label", "score"])
+ClassificationList = namedtuple("ClassificationList", ["classification"])
+ReplayResults = namedtuple("ReplayResults", ["multi_hand_landmarks", "multi_handedness"])
+
+
+# Simulated clock for replays: time only moves when a frame is replayed or a
+# game waits, so time-based rules run as fast as the CPU allows
+class ReplayClock:
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def advance_to(self, timestamp):
+        self.now = max(self.now, timestamp)
+
+
+# Replays a recorded video file as if it were the camera
+class VideoFileSource:
+    def __init__(self, path, clock):
+        self.cap = cv2.VideoCapture(path)
+        self.clock = clock
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        self.frame_index = 0
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if ret:
+            self.clock.advance_to(self.frame_index * self.frame_interval)
+            self.frame_index += 1
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+# Convert one recorded line back into Mediapipe-like results
+def results_from_record(record):
+    if not record["hands"]:
+        return ReplayResults(None, None)
+    hand_landmarks = []
+    handedness = []
+    for hand in record["hands"]:
+        hand_landmarks.append(LandmarkList([Landmark(*point) for point in hand["landmarks"]]))
+        handedness.append(ClassificationList([Classification(hand["label"], hand["score"])]))
+    return ReplayResults(hand_landmarks, handedness)
+
+
+# Convert Mediapipe results into one JSON-serialisable record
+def record_from_results(results, timestamp, frame_shape):
+    hands = []
+    if results.multi_hand_landmarks:
+        handedness = results.multi_handedness or []
+        for hand_idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
+            label, score = "Right", 1.0
+            if hand_idx < len(handedness):
+                label = handedness[hand_idx].classification[0].label
+                score = handedness[hand_idx].classification[0].score
+            hands.append({
+                "label": label,
+                "score": round(float(score), 4),
+                "landmarks": [[round(lm.x, 5), round(lm.y, 5), round(lm.z, 5)] for lm in hand_landmarks.landmark],
+            })
+    return {"t": timestamp, "size": [frame_shape[0], frame_shape[1]], "hands": hands}
+
+
+# Writes the landmarks of every processed frame to a JSON-lines file
+class LandmarkRecorder:
+    def __init__(self, path):
+        self.file = open(path, "w")
+
+    def write(self, hand_frame):
+        record = record_from_results(hand_frame.results, hand_frame.timestamp, hand_frame.frame.shape)
+        self.file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+# Detector that hands back the recorded results in order instead of running Mediapipe
+class ReplayDetector:
+    def __init__(self, source):
+        self.source = source
+
+    def process(self, frame_rgb):
+        return self.source.current_results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+# Replays a landmark file written by LandmarkRecorder. Frames are blank images
+# of the recorded size; the landmarks come from the file, so Mediapipe never runs.
+class LandmarkFileSource:
+    def __init__(self, path, clock):
+        with open(path) as file:
+            self.records = [json.loads(line) for line in file if line.strip()]
+        self.clock = clock
+        self.index = 0
+        self.current_results = None
+        self.start_time = self.records[0]["t"] if self.records else 0.0
+
+    def is_opened(self):
+        return bool(self.records)
+
+    def read(self):
+        if self.index >= len(self.records):
+            return False, None
+        record = self.records[self.index]
+        self.index += 1
+        self.clock.advance_to(record["t"] - self.start_time)
+        self.current_results = results_from_record(record)
+        h, w = record["size"]
+        return True, np.zeros((h, w, 3), dtype=np.uint8)
+
+    def make_detector(self):
+        return ReplayDetector(self)
+
+    def release(self):
+        pass
@@ -0,0 +1,296 @@
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from preprocess import results_from_points
+from replay import Classification, ClassificationList, ReplayDetector
+
+# Session recording (.hsr): the landmarks and game events of a whole play
+# session in a compact binary file that can be memory-mapped and read chunk
+# by chunk without decoding the rest.
+#
+#   header  magic, version, points per hand, quantization scale, frame height and width
+#   chunk*  CHUNK_HEADER, then 8-byte aligned arrays:
+#             time_deltas  uint32[frames]   microseconds since the previous frame (the first is 0)
+#             hand_counts  uint8[frames]
+#             handedness   uint8[hands]     1 for a "Right" hand
+#             scores       uint8[hands]     handedness confidence * 255
+#             landmarks    int16[hands, 21, 3]  x, y, z * scale; the wrist as is,
+#                                               the other points relative to the wrist
+#             events       JSON list of [frame, timestamp, kind, data]; frame is the
+#                                          last frame recorded when the event happened
+#   index   int64[chunks, 2]  (first frame, file offset) of every chunk
+#   footer  index offset, chunk count, end magic
+#
+# A file cut short (the game crashed) has no index; the reader then finds the
+# chunks by walking them from the start.
+HEADER = struct.Struct("<4sHHIHH")
+CHUNK_HEADER = struct.Struct("<IIIId")  # frames, hands, event bytes, reserved, first timestamp
+FOOTER = struct.Struct("<QQ4s")
+MAGIC = b"HSR1"
+END_MAGIC = b"HSRI"
+VERSION = 1
+POINTS = 21
+SCALE = 8192  # 1/8192 of the frame, about 0.1 px on a 640 px wide frame
+MAX_DELTA_US = 2 ** 32 - 1
+
+
+def aligned(size):
+    return (size + 7) // 8 * 8
+
+
+# Writes one session. write(hand_frame) has the same interface as
+# LandmarkRecorder, so the engine can use either; event() adds game events.
+# Frames are buffered and written a chunk at a time.
+class SessionRecorder:
+    def __init__(self, path, chunk_frames=256, player=None):
+        self.file = open(path, "wb")
+        self.player = player  # Goes into each game's "start" event
+        self.chunk_frames = chunk_frames
+        self.lock = threading.Lock()  # Frames come from the inference thread, events from the game
+        self.index = []
+        self.frames_written = 0
+        self.header_written = False
+        self.reset_chunk()
+
+    def reset_chunk(self):
+        self.timestamps = []
+        self.hand_counts = []
+        self.handedness = []
+        self.scores = []
+        self.landmarks = []
+        self.events = []
+
+    def write(self, hand_frame):
+        hands = hand_frame.hands
+        with self.lock:
+            if not self.header_written:
+                h, w = hand_frame.frame.shape[:2]
+                self.file.write(HEADER.pack(MAGIC, VERSION, POINTS, SCALE, h, w))
+                self.header_written = True
+            if self.timestamps and (hand_frame.timestamp - self.timestamps[-1]) * 1e6 > MAX_DELTA_US:
+                self.flush_chunk()
+            self.timestamps.append(hand_frame.timestamp)
+            self.hand_counts.append(len(hands.points))
+            if len(hands.points):
+                self.handedness.append(hands.is_right.astype(np.uint8))
+                self.scores.append(np.clip(np.round(hands.scores * 255), 0, 255).astype(np.uint8))
+                self.landmarks.append(hands.points)
+            if len(self.timestamps) >= self.chunk_frames:
+                self.flush_chunk()
+
+    # A game event (score, round, gesture...) at a capture timestamp
+    def event(self, kind, timestamp, data=None):
+        with self.lock:
+            self.events.append([self.frames_written + len(self.timestamps) - 1, timestamp, kind, data])
+
+    # Gesture events, as a gestures.subscribers callback
+    def gesture(self, event):
+        self.event(event.kind, event.timestamp,
+                   {"hand": event.hand, "value": event.value, "duration": event.duration})
+
+    def flush_chunk(self):
+        if not self.timestamps and not self.events:
+            return
+        timestamps = np.array(self.timestamps, dtype=np.float64)
+        first_timestamp = timestamps[0] if len(timestamps) else 0.0
+        # Deltas of the rounded offsets, so rounding never adds up along the chunk
+        offsets_us = np.round((timestamps - first_timestamp) * 1e6).astype(np.int64)
+        deltas = np.zeros(len(timestamps), dtype=np.uint32)
+        deltas[1:] = np.diff(offsets_us)
+        if self.landmarks:
+            points = np.concatenate(self.landmarks)
+            relative = points.copy()
+            relative[:, 1:, :] -= points[:, :1, :]
+            landmarks = np.clip(np.round(relative * SCALE), -32768, 32767).astype(np.int16)
+            handedness = np.concatenate(self.handedness)
+            scores = np.concatenate(self.scores)
+        else:
+            landmarks = np.zeros((0, POINTS, 3), dtype=np.int16)
+            handedness = scores = np.zeros(0, dtype=np.uint8)
+        events = json.dumps(self.events, default=lambda value: value.item()).encode() if self.events else b""
+
+        self.index.append((self.frames_written, self.file.tell()))
+        self.file.write(CHUNK_HEADER.pack(len(timestamps), len(landmarks), len(events), 0, first_timestamp))
+        for array in (deltas, np.array(self.hand_counts, dtype=np.uint8), handedness, scores, landmarks):
+            self.write_aligned(array.tobytes())
+        self.write_aligned(events)
+        self.file.flush()  # Whole chunks reach the disk, even if the game crashes later
+        self.frames_written += len(timestamps)
+        self.reset_chunk()
+
+    def write_aligned(self, data):
+        self.file.write(data)
+        self.file.write(b"\0" * (aligned(len(data)) - len(data)))
+
+    def close(self):
+        with self.lock:
+            if not self.header_written:
+                self.file.write(HEADER.pack(MAGIC, VERSION, POINTS, SCALE, 0, 0))
+            self.flush_chunk()
+            index_offset = self.file.tell()
+            self.file.write(np.array(self.index, dtype=np.int64).reshape(-1, 2).tobytes())
+            self.file.write(FOOTER.pack(index_offset, len(self.index), END_MAGIC))
+            self.file.close()
+
+
+# One chunk of a session file. The arrays are views into the mapped file;
+# timestamps() and points() decode only this chunk.
+class SessionChunk:
+    def __init__(self, buffer, offset, first_frame):
+        self.first_frame = first_frame
+        frames, hands, event_bytes, _, self.first_timestamp = CHUNK_HEADER.unpack_from(buffer, offset)
+        self.frames = frames
+        offset += CHUNK_HEADER.size
+        self.time_deltas = np.frombuffer(buffer, np.uint32, frames, offset)
+        offset += aligned(frames * 4)
+        self.hand_counts = np.frombuffer(buffer, np.uint8, frames, offset)
+        offset += aligned(frames)
+        self.handedness = np.frombuffer(buffer, np.uint8, hands, offset)
+        offset += aligned(hands)
+        self.scores = np.frombuffer(buffer, np.uint8, hands, offset)
+        offset += aligned(hands)
+        self.landmarks = np.frombuffer(buffer, np.int16, hands * POINTS * 3, offset).reshape(hands, POINTS, 3)
+        offset += aligned(hands * POINTS * 3 * 2)
+        self.event_data = buffer[offset:offset + event_bytes]
+        self.end = offset + aligned(event_bytes)
+
+    # Capture timestamps of the chunk's frames
+    def timestamps(self):
+        return self.first_timestamp + np.cumsum(self.time_deltas, dtype=np.float64) / 1e6
+
+    # Normalized landmarks of every hand in the chunk, shape (hands, 21, 3)
+    def points(self):
+        points = self.landmarks.astype(np.float32) / SCALE
+        points[:, 1:, :] += points[:, :1, :]
+        return points
+
+    # Index of each frame's first hand in the chunk's hand arrays
+    def hand_offsets(self):
+        offsets = np.zeros(self.frames + 1, dtype=np.int64)
+        np.cumsum(self.hand_counts, out=offsets[1:])
+        return offsets
+
+    def events(self):
+        if not len(self.event_data):
+            return []
+        return [tuple(event) for event in json.loads(bytes(self.event_data))]
+
+
+# Reads a session file through a memory map. Chunks are only parsed when asked
+# for, so scanning many sessions for e.g. hand counts or events stays cheap.
+class SessionReader:
+    def __init__(self, path):
+        if os.path.getsize(path) < HEADER.size:
+            raise ValueError(f"{path} is not a session recording")
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, points, self.scale, self.height, self.width = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or points != POINTS:
+            raise ValueError(f"{path} is not a session recording (version {VERSION})")
+        self.chunk_table = self.read_index(size)
+        self.chunk_cache = {}
+        self.frames = 0
+        if len(self.chunk_table):
+            self.frames = int(self.chunk_table[-1, 0]) + self.chunk(len(self.chunk_table) - 1).frames
+
+    # (first frame, offset) of every chunk, from the index or by walking the chunks
+    def read_index(self, size):
+        if size >= HEADER.size + FOOTER.size:
+            index_offset, chunks, end_magic = FOOTER.unpack_from(self.map, size - FOOTER.size)
+            if end_magic == END_MAGIC:
+                return np.frombuffer(self.map, np.int64, chunks * 2, index_offset).reshape(chunks, 2)
+        table = []
+        offset, first_frame = HEADER.size, 0
+        while offset + CHUNK_HEADER.size <= size:
+            try:
+                chunk = SessionChunk(self.map, offset, first_frame)
+            except (ValueError, struct.error):
+                break  # Last chunk only partly written
+            table.append((first_frame, offset))
+            offset, first_frame = chunk.end, first_frame + chunk.frames
+        return np.array(table, dtype=np.int64).reshape(-1, 2)
+
+    def __len__(self):
+        return self.frames
+
+    @property
+    def chunk_count(self):
+        return len(self.chunk_table)
+
+    def chunk(self, chunk_idx):
+        chunk = self.chunk_cache.get(chunk_idx)
+        if chunk is None:
+            first_frame, offset = self.chunk_table[chunk_idx]
+            chunk = self.chunk_cache[chunk_idx] = SessionChunk(self.map, int(offset), int(first_frame))
+        return chunk
+
+    def chunks(self):
+        for chunk_idx in range(self.chunk_count):
+            yield self.chunk(chunk_idx)
+
+    # One frame: (timestamp, points (hands, 21, 3), is_right, scores)
+    def frame(self, frame_idx):
+        chunk_idx = int(np.searchsorted(self.chunk_table[:, 0], frame_idx, side="right")) - 1
+        chunk = self.chunk(chunk_idx)
+        local = frame_idx - chunk.first_frame
+        start = int(chunk.hand_counts[:local].sum())
+        end = start + int(chunk.hand_counts[local])
+        points = chunk.landmarks[start:end].astype(np.float32) / SCALE
+        points[:, 1:, :] += points[:, :1, :]
+        timestamp = chunk.first_timestamp + chunk.time_deltas[:local + 1].sum(dtype=np.float64) / 1e6
+        return timestamp, points, chunk.handedness[start:end] == 1, chunk.scores[start:end] / 255
+
+    # Per-frame arrays for the whole session
+    def timestamps(self):
+        return np.concatenate([chunk.timestamps() for chunk in self.chunks()] or [np.zeros(0)])
+
+    def hand_counts(self):
+        return np.concatenate([chunk.hand_counts for chunk in self.chunks()] or [np.zeros(0, np.uint8)])
+
+    def events(self):
+        return [event for chunk in self.chunks() for event in chunk.events()]
+
+    def close(self):
+        self.chunk_cache = {}
+        self.chunk_table = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # Arrays handed out still point into the map; it closes once they are gone
+        self.file.close()
+
+
+# Replays a session recording like LandmarkFileSource replays a .jsonl file
+class SessionFileSource:
+    def __init__(self, path, clock):
+        self.reader = SessionReader(path)
+        self.clock = clock
+        self.index = 0
+        self.current_results = None
+        self.start_time = self.reader.frame(0)[0] if len(self.reader) else 0.0
+
+    def is_opened(self):
+        return len(self.reader) > 0
+
+    def read(self):
+        if self.index >= len(self.reader):
+            return False, None
+        timestamp, points, is_right, scores = self.reader.frame(self.index)
+        self.index += 1
+        self.clock.advance_to(timestamp - self.start_time)
+        handedness = [ClassificationList([Classification("Right" if right else "Left", float(score))])
+                      for right, score in zip(is_right, scores)]
+        self.current_results = results_from_points(points, handedness)
+        return True, np.zeros((self.reader.height, self.reader.width, 3), dtype=np.uint8)
+
+    def make_detector(self):
+        return ReplayDetector(self)
+
+    def release(self):
+        self.reader.close()
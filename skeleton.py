@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+
+# Mediapipe's 21-point hand skeleton (mp.solutions.hands.HAND_CONNECTIONS)
+HAND_CONNECTIONS = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 4),  # Thumb
+    (0, 5), (5, 6), (6, 7), (7, 8),  # Index finger
+    (5, 9), (9, 10), (10, 11), (11, 12),  # Middle finger
+    (9, 13), (13, 14), (14, 15), (15, 16),  # Ring finger
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),  # Little finger and palm
+])
+
+# Detail levels:
+#   full  what mp_drawing.draw_landmarks drew with the games' styles, pixel for pixel
+#         (where hands overlap, all joints now sit above all connections)
+#   low   thin lines only, for slow machines
+#   off   nothing
+DETAIL_LEVELS = ("full", "low", "off")
+
+JOINT_COLOR = (0, 255, 0)
+JOINT_RADIUS = 4
+BORDER_COLOR = (224, 224, 224)  # Mediapipe's white ring around each joint
+CONNECTION_COLOR = (255, 0, 0)
+THICKNESS = 2
+
+
+# Pixels of one joint (white ring with the coloured ring inside, as Mediapipe
+# draws them), as offsets from the joint's centre and their colours
+def joint_sprite(radius, thickness, color, border_color):
+    border_radius = max(radius + 1, int(radius * 1.2))
+    size = 2 * (border_radius + thickness) + 1
+    center = (size // 2, size // 2)
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    mask = np.zeros((size, size), dtype=np.uint8)
+    for circle_radius, circle_color in ((border_radius, border_color), (radius, color)):
+        cv2.circle(image, center, circle_radius, circle_color, thickness)
+        cv2.circle(mask, center, circle_radius, 255, thickness)
+    ys, xs = np.nonzero(mask)
+    return np.stack([ys - center[1], xs - center[0]], axis=1), image[ys, xs]
+
+
+# Draws the skeletons of all hands in a frame at once: every connection in one
+# cv2.polylines call and every joint as a pre-rendered sprite copied in with a
+# single NumPy assignment, instead of a cv2 call per line and circle per hand.
+class SkeletonRenderer:
+    def __init__(self, detail="full"):
+        if detail not in DETAIL_LEVELS:
+            raise ValueError(f"Unknown skeleton detail {detail!r} (choose from {', '.join(DETAIL_LEVELS)})")
+        self.detail = detail
+        self.joint_offsets, self.joint_colors = joint_sprite(JOINT_RADIUS, THICKNESS, JOINT_COLOR, BORDER_COLOR)
+        self.sprite_margin = int(np.abs(self.joint_offsets).max())
+        self.border_radius = max(JOINT_RADIUS + 1, int(JOINT_RADIUS * 1.2))
+        self.offsets_width = None
+        self.offsets = None
+        self.colors = self.joint_colors[:0]
+
+    # Landmark pixel positions, as Mediapipe rounds them, and which are inside the frame
+    @staticmethod
+    def to_pixels(points, width, height):
+        xy = points[:, :, :2].astype(np.float64)
+        visible = ((xy >= 0) & (xy <= 1)).all(axis=2)
+        pixels = np.floor(xy * (width, height)).astype(np.int32)
+        np.minimum(pixels, (width - 1, height - 1), out=pixels)
+        return pixels, visible
+
+    # points: (n_hands, 21, 3) normalized landmarks, e.g. HandArray.points
+    def draw(self, frame, points):
+        if self.detail == "off" or len(points) == 0:
+            return
+        height, width = frame.shape[:2]
+        pixels, visible = self.to_pixels(points, width, height)
+
+        # Connections whose two ends are inside the frame, all hands in one call
+        starts, ends = HAND_CONNECTIONS[:, 0], HAND_CONNECTIONS[:, 1]
+        drawn = visible[:, starts] & visible[:, ends]
+        segments = np.stack([pixels[:, starts], pixels[:, ends]], axis=2)[drawn]
+        thickness = THICKNESS if self.detail == "full" else 1
+        if len(segments):
+            cv2.polylines(frame, segments, False, CONNECTION_COLOR, thickness)
+        if self.detail != "full":
+            return
+
+        # Joints: every sprite pixel of every visible joint, later joints on top
+        # (a flat index array is assigned in order, so the last write to a pixel wins)
+        ys, xs = pixels[visible][:, 1], pixels[visible][:, 0]
+        if len(ys) == 0:
+            return
+        margin = self.sprite_margin
+        inner = (ys >= margin) & (xs >= margin) & (ys < height - margin) & (xs < width - margin)
+        if not frame.flags.c_contiguous:
+            inner[:] = False
+        # Runs of joints in drawing order, so overlapping joints stack as before
+        run_starts = np.flatnonzero(np.diff(inner.astype(np.int8), prepend=2))
+        for start, end in zip(run_starts.tolist(), run_starts[1:].tolist() + [len(ys)]):
+            if inner[start]:
+                spots = ((ys[start:end] * width + xs[start:end])[:, None] + self.flat_offsets(width)).ravel()
+                frame.reshape(-1, 3)[spots] = self.colors_for(end - start)
+                continue
+            # cv2 clips circles at the frame's edges with its own rasterisation,
+            # so joints near an edge are drawn the way Mediapipe did
+            for y, x in zip(ys[start:end].tolist(), xs[start:end].tolist()):
+                cv2.circle(frame, (x, y), self.border_radius, BORDER_COLOR, THICKNESS)
+                cv2.circle(frame, (x, y), JOINT_RADIUS, JOINT_COLOR, THICKNESS)
+
+    # Sprite pixel offsets in a flattened frame of this width
+    def flat_offsets(self, width):
+        if self.offsets_width != width:
+            self.offsets_width = width
+            self.offsets = self.joint_offsets[:, 0] * width + self.joint_offsets[:, 1]
+        return self.offsets
+
+    # Sprite colours repeated for this many joints
+    def colors_for(self, joints):
+        if len(self.colors) < joints * len(self.joint_colors):
+            self.colors = np.tile(self.joint_colors, (joints, 1))
+        return self.colors[:joints * len(self.joint_colors)]
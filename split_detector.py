@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from landmarks import landmarks_from_results
+from preprocess import results_from_points
+from startup import LazyModule
+
+mp_hands = LazyModule("mediapipe", "solutions.hands")
+
+
+# Hand detector for games played in two halves of the screen (left vs right).
+# Each half gets its own Mediapipe graph with its own hand budget and tracking,
+# so a crowded side never takes hand slots from the other one. Both halves are
+# processed at the same time, each graph always on its own worker thread
+# (Mediapipe runs its graph outside the GIL). Landmarks are mapped back to the
+# full frame, left side's hands first, so games never see the difference.
+class SplitDetector:
+    def __init__(self, max_num_hands=2, min_detection_confidence=0.5):
+        self.detectors = [
+            mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=max_num_hands,
+                min_detection_confidence=min_detection_confidence,
+            )
+            for _ in range(2)
+        ]
+        self.workers = [ThreadPoolExecutor(max_workers=1) for _ in range(2)]
+
+    def process(self, frame_rgb):
+        width = frame_rgb.shape[1]
+        middle_x = width // 2
+        halves = (frame_rgb[:, :middle_x], frame_rgb[:, middle_x:])
+        futures = [worker.submit(detector.process, np.ascontiguousarray(half))
+                   for worker, detector, half in zip(self.workers, self.detectors, halves)]
+
+        all_points, handedness = [], []
+        for future, x0, half in zip(futures, (0, middle_x), halves):
+            results = future.result()
+            points, _, _ = landmarks_from_results(results)
+            if len(points) == 0:
+                continue
+            half_width = half.shape[1]
+            points[:, :, 0] = (x0 + points[:, :, 0] * half_width) / width
+            points[:, :, 2] *= half_width / width
+            all_points.append(points)
+            handedness.extend(results.multi_handedness[:len(points)])
+
+        if not all_points:
+            return results_from_points(np.zeros((0, 21, 3), dtype=np.float32), None)
+        return results_from_points(np.concatenate(all_points), handedness)
+
+    def close(self):
+        for worker in self.workers:
+            worker.shutdown()
+        for detector in self.detectors:
+            detector.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,36 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+
+
+# Collects per-stage durations (in seconds) and summarises them as percentiles
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    # Wrap a function so every call is timed under the given stage
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        stats = {}
+        for stage, samples in self.samples.items():
+            values = np.array(samples) * 1000
+            stats[stage] = {
+                "count": len(values),
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "p99_ms": float(np.percentile(values, 99)),
+            }
+        return stats
@@ -0,0 +1,81 @@
+import importlib
+import sys
+import threading
+import time
+
+# Reference point for the startup report: when the first game module was imported
+PROCESS_START = time.perf_counter()
+
+
+# Times of the startup steps (imports, camera, detector, warm-up, assets...).
+# The steps run on different threads at the same time, so the report lists
+# when each started and ended, and the time to the first frame.
+class StartupReport:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = []  # (name, start, end) in seconds since PROCESS_START
+        self.reported = False
+
+    def add(self, name, start, end):
+        with self.lock:
+            self.steps.append((name, start - PROCESS_START, end - PROCESS_START))
+
+    # Time the block as one step
+    def step(self, name):
+        return StartupStep(self, name)
+
+    # Print the breakdown once, when the first frame is on screen
+    def first_frame(self):
+        with self.lock:
+            if self.reported:
+                return
+            self.reported = True
+            steps = sorted(self.steps, key=lambda step: step[1])
+        total = time.perf_counter() - PROCESS_START
+        parts = [f"{name} {(end - start) * 1000:.0f} ms (at {start * 1000:.0f})" for name, start, end in steps]
+        print(f"Startup {total * 1000:.0f} ms to the first frame: " + ", ".join(parts))
+
+
+class StartupStep:
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.report.add(self.name, self.start, time.perf_counter())
+
+
+report = StartupReport()
+
+
+# Stands in for a heavy module, or an attribute path inside it such as
+# LazyModule("mediapipe", "solutions.hands"), and imports it on first use.
+# Module-level names stay as they were, but the import runs where it is first
+# needed (on the inference thread for Mediapipe), alongside the camera opening.
+class LazyModule:
+    def __init__(self, name, attribute_path=""):
+        self._name = name
+        self._attribute_path = attribute_path
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    if self._name in sys.modules:
+                        target = importlib.import_module(self._name)
+                    else:
+                        with report.step(f"import {self._name}"):
+                            target = importlib.import_module(self._name)
+                    for attribute in filter(None, self._attribute_path.split(".")):
+                        target = getattr(target, attribute)
+                    self._target = target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
@@ -0,0 +1,250 @@
+import json
+import os
+import platform
+import threading
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+import gestures
+
+# Upper bounds (ms) of the stage latency histogram buckets; the last bucket is +Inf
+STAGE_BUCKETS_MS = (1, 2, 5, 10, 20, 33, 50, 100, 200, 500)
+
+
+# Latency histogram with fixed buckets, so it costs the same after hours of play
+class Histogram:
+    def __init__(self, bounds=STAGE_BUCKETS_MS):
+        self.bounds = np.array(bounds, dtype=np.float64)
+        self.counts = np.zeros(len(bounds) + 1, dtype=np.int64)
+        self.total = 0.0
+
+    def observe(self, ms):
+        self.counts[np.searchsorted(self.bounds, ms)] += 1
+        self.total += ms
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    # Cumulative (le, count) pairs as Prometheus expects them
+    def cumulative(self):
+        running = np.cumsum(self.counts)
+        les = [f"{bound:g}" for bound in self.bounds] + ["+Inf"]
+        return list(zip(les, running.tolist()))
+
+
+# Totals of one game since the process started (Prometheus counters only go up)
+class GameStats:
+    def __init__(self):
+        self.sessions = 0
+        self.frames = 0
+        self.dropped = 0
+        self.hands = Counter()  # Frames by number of hands seen
+        self.events = Counter()
+        self.stages = {}
+
+
+# Performance telemetry of the game sessions played in this process: FPS,
+# per-stage latency histograms, dropped frames, hands per frame and gesture
+# events. It is the engine's stage timer, so the engine stages come in
+# through add(); the game loop reports each frame through frame().
+# Every flush_interval seconds, and when a session ends, one JSON line is
+# appended to <directory>/telemetry.jsonl and <directory>/hand_games_<pid>.prom
+# is rewritten in the Prometheus text format (for the node exporter's textfile
+# collector). Without a directory nothing is written and it only feeds the
+# on-screen performance HUD. A StageTimer given as timer (benchmark.py) still
+# gets every sample.
+# The capture, inference and render threads report stages while the game
+# thread begins and ends sessions (the engine keeps running between games in
+# the game host), so the session state is only touched under self.lock; the
+# files are written outside of it.
+class SessionTelemetry:
+    def __init__(self, directory=None, flush_interval=10.0, timer=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.timer = timer
+        self.instance = f"{platform.node()}:{os.getpid()}"
+        self.games = {}
+        self.game = None
+        self.stats = None
+        self.recent_ms = {}  # Smoothed stage times for the HUD
+        self.fps = 0.0
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.jsonl_path = os.path.join(directory, "telemetry.jsonl")
+            self.prom_path = os.path.join(directory, f"hand_games_{os.getpid()}.prom")
+
+    # A game starts on the engine
+    def begin(self, game):
+        with self.lock:
+            self.game = game
+            self.session_start = self.last_flush = time.perf_counter()
+            self.session_frames = self.frames_at_flush = 0
+            self.session_dropped = 0
+            self.events_at_begin = gestures.event_counts.copy()
+            self.events_seen = gestures.event_counts.copy()
+            stats = self.games.setdefault(game, GameStats())
+            stats.sessions += 1
+            self.stats = stats
+
+    # Stage timer interface, as StageTimer.add
+    def add(self, stage, seconds):
+        if self.timer is not None:
+            self.timer.add(stage, seconds)
+        ms = seconds * 1000
+        with self.lock:
+            if self.stats is None:
+                return
+            histogram = self.stats.stages.get(stage)
+            if histogram is None:
+                histogram = self.stats.stages[stage] = Histogram()
+            histogram.observe(ms)
+            previous = self.recent_ms.get(stage)
+            self.recent_ms[stage] = ms if previous is None else 0.9 * previous + 0.1 * ms
+
+    # Frames the engine skipped to stay on the newest one
+    def dropped(self, count):
+        with self.lock:
+            if self.stats is not None:
+                self.stats.dropped += count
+                self.session_dropped += count
+
+    # One frame played by the game
+    def frame(self, hand_frame):
+        now = time.perf_counter()
+        with self.lock:
+            if self.stats is None:
+                return
+            self.stats.frames += 1
+            self.session_frames += 1
+            self.stats.hands[len(hand_frame.hands.points)] += 1
+            due = now - self.last_flush >= self.flush_interval
+        if due:
+            self.flush(now)
+
+    def collect_events(self):
+        counts = gestures.event_counts
+        self.stats.events.update(counts - self.events_seen)
+        self.events_seen = counts.copy()
+
+    # The game ended: write what is left
+    def end(self):
+        self.flush(time.perf_counter(), ended=True)
+        with self.lock:
+            self.stats = None
+
+    def flush(self, now, ended=False):
+        with self.lock:
+            if self.stats is None:
+                return
+            self.collect_events()
+            interval = now - self.last_flush
+            if interval > 0:
+                self.fps = (self.session_frames - self.frames_at_flush) / interval
+            self.last_flush = now
+            self.frames_at_flush = self.session_frames
+            if not self.directory:
+                return
+            record = self.session_record(now, ended)
+            prometheus_text = self.prometheus_text()
+        try:
+            with open(self.jsonl_path, "a") as file:
+                file.write(json.dumps(record) + "\n")
+            # Replaced in one step so a scrape never sees half of it
+            temporary_path = self.prom_path + ".tmp"
+            with open(temporary_path, "w") as file:
+                file.write(prometheus_text)
+            os.replace(temporary_path, self.prom_path)
+        except OSError as error:
+            print(f"Could not write telemetry: {error}")
+
+    # JSON line of the session so far (under the lock)
+    def session_record(self, now, ended):
+        stats = self.stats
+        return {
+            "time": time.time(),
+            "instance": self.instance,
+            "game": self.game,
+            "ended": ended,
+            "session_seconds": round(now - self.session_start, 3),
+            "frames": self.session_frames,
+            "fps": round(self.fps, 2),
+            "dropped_frames": self.session_dropped,
+            "hands_per_frame": {str(hands): count for hands, count in sorted(stats.hands.items())},
+            "events": dict(gestures.event_counts - self.events_at_begin),
+            "stages_ms": {stage: {"count": histogram.count, "mean": round(histogram.total / max(histogram.count, 1), 3),
+                                  "buckets": dict(histogram.cumulative())}
+                          for stage, histogram in stats.stages.items()},
+        }
+
+    # Every game's metrics in the Prometheus text format (under the lock)
+    def prometheus_text(self):
+        metrics = {
+            "hand_games_frames_total": ("counter", "Frames played.", []),
+            "hand_games_dropped_frames_total": ("counter", "Frames skipped to stay on the newest one.", []),
+            "hand_games_sessions_total": ("counter", "Game sessions started.", []),
+            "hand_games_fps": ("gauge", "Frames per second over the last flush interval.", []),
+            "hand_games_hands_frames_total": ("counter", "Frames by number of hands seen.", []),
+            "hand_games_gesture_events_total": ("counter", "Gesture events by kind.", []),
+            "hand_games_stage_latency_ms": ("histogram", "Time spent per pipeline stage.", []),
+        }
+        for game, stats in sorted(self.games.items()):
+            labels = f'instance="{self.instance}",game="{game}"'
+            metrics["hand_games_frames_total"][2].append(f"{{{labels}}} {stats.frames}")
+            metrics["hand_games_dropped_frames_total"][2].append(f"{{{labels}}} {stats.dropped}")
+            metrics["hand_games_sessions_total"][2].append(f"{{{labels}}} {stats.sessions}")
+            if game == self.game:
+                metrics["hand_games_fps"][2].append(f"{{{labels}}} {self.fps:.2f}")
+            for hands, count in sorted(stats.hands.items()):
+                metrics["hand_games_hands_frames_total"][2].append(f'{{{labels},hands="{hands}"}} {count}')
+            for kind, count in sorted(stats.events.items()):
+                metrics["hand_games_gesture_events_total"][2].append(f'{{{labels},kind="{kind}"}} {count}')
+            for stage, histogram in sorted(stats.stages.items()):
+                stage_labels = f'{labels},stage="{stage}"'
+                samples = metrics["hand_games_stage_latency_ms"][2]
+                for le, count in histogram.cumulative():
+                    samples.append(f'_bucket{{{stage_labels},le="{le}"}} {count}')
+                samples.append(f"_sum{{{stage_labels}}} {histogram.total:.3f}")
+                samples.append(f"_count{{{stage_labels}}} {histogram.count}")
+
+        # Every metric's samples have to follow its HELP and TYPE lines
+        lines = []
+        for name, (kind, help_text, samples) in metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(name + sample for sample in samples)
+        return "\n".join(lines) + "\n"
+
+    # Live numbers in the top right corner of the frame (toggled with 'p' in the games)
+    def draw_hud(self, frame):
+        with self.lock:
+            if self.stats is None:
+                return
+            self.collect_events()
+            now = time.perf_counter()
+            interval = now - self.last_flush
+            fps = (self.session_frames - self.frames_at_flush) / interval if interval >= 1 else self.fps
+            lines = [f"FPS {fps:.1f}  dropped {self.session_dropped}"]
+            for stage in ("read", "inference", "track", "update", "show", "render", "latency"):
+                if stage in self.recent_ms:
+                    lines.append(f"{stage} {self.recent_ms[stage]:.1f} ms")
+            hands_seen = sum(hands * count for hands, count in self.stats.hands.items())
+            lines.append(f"hands/frame {hands_seen / max(self.stats.frames, 1):.2f}")
+        events = gestures.event_counts - self.events_at_begin
+        if events:
+            lines.append(" ".join(f"{kind} {count}" for kind, count in sorted(events.items())))
+
+        x = frame.shape[1] - 260
+        cv2.rectangle(frame, (x - 10, 0), (frame.shape[1], 22 * len(lines) + 10), (0, 0, 0), -1)
+        for line_idx, line in enumerate(lines):
+            cv2.putText(frame, line, (x, 22 * (line_idx + 1)), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 255, 255), 1)
+
+    # Flush and take this process's metrics out of the exporter
+    def close(self):
+        self.end()
+        if self.directory and os.path.exists(self.prom_path):
+            os.remove(self.prom_path)
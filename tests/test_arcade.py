@@ -0,0 +1,54 @@
+import queue
+import time
+
+import numpy as np
+import pytest
+
+import arcade
+from arcade import StationLink
+
+
+@pytest.fixture
+def link():
+    link = StationLink(0, queue.Queue(), queue.Queue())
+    yield link
+    link.close()
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_answered_frame_comes_back_with_its_capture_time(link):
+    detector = link.make_detector(2, 0.5)
+    link.results.put((1, []))  # The answer is there before the request; only its seq matters
+    results = detector.process(frame(1), 12.5)
+    assert results.multi_hand_landmarks is None
+    station_id, ring_name, seq, max_num_hands, _ = link.requests.get_nowait()
+    assert (station_id, ring_name, seq, max_num_hands) == (0, link.ring.name, 1, 2)
+    shared, timestamp = link.ring.read(seq)
+    assert timestamp == 12.5
+    assert (shared == 1).all()
+
+
+def test_stalled_worker_neither_blocks_nor_gets_more_frames(link, monkeypatch):
+    monkeypatch.setattr(arcade, "WORKER_TIMEOUT", 0.05)
+    detector = link.make_detector(2, 0.5)
+    detector.process(frame(1), 1.0)  # Times out
+    assert link.requests.qsize() == 1
+
+    # While stalled, frames return at once and the frame in flight stays in its slot
+    start = time.perf_counter()
+    for value in range(2, 10):
+        assert detector.process(frame(value), float(value)).multi_hand_landmarks is None
+    assert time.perf_counter() - start < 0.05
+    assert link.requests.qsize() == 1
+    shared, _ = link.ring.read(1)
+    assert (shared == 1).all()
+
+    # The late answer ends the stall: the next frame is sent again
+    link.results.put((1, []))
+    link.results.put((2, []))
+    detector.process(frame(10), 10.0)
+    assert link.requests.qsize() == 2
+    assert detector.pending is None
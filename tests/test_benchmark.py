@@ -0,0 +1,34 @@
+from benchmark import find_clip, find_regressions
+
+
+def make_result(fps, inference_ms, hud_ms):
+    return {"fps": fps, "stages": {"inference": {"p95_ms": inference_ms}, "hud": {"p95_ms": hud_ms}}}
+
+
+def test_find_clip_takes_videos_only(tmp_path):
+    (tmp_path / "default.jsonl").write_text("")
+    assert find_clip(str(tmp_path), "hand_detection.py") is None
+    assert find_clip(str(tmp_path), "hand_detection.py", landmarks=True) == str(tmp_path / "default.jsonl")
+    (tmp_path / "default.mp4").write_bytes(b"")
+    (tmp_path / "number_hands.mp4").write_bytes(b"")
+    assert find_clip(str(tmp_path), "hand_detection.py") == str(tmp_path / "default.mp4")
+    assert find_clip(str(tmp_path), "number_hands.py") == str(tmp_path / "number_hands.mp4")
+
+
+def test_regressions_on_the_same_machine():
+    baseline = {"game.py": make_result(100, 10, 1)}
+    assert find_regressions({"game.py": make_result(95, 11, 1.1)}, baseline, 0.2) == []
+    assert len(find_regressions({"game.py": make_result(70, 15, 1.1)}, baseline, 0.2)) == 2
+
+
+def test_baseline_from_a_faster_machine_is_scaled():
+    baseline = {"game.py": make_result(100, 10, 1)}
+    # Twice as slow everywhere on a machine that calibrates twice as slow
+    assert find_regressions({"game.py": make_result(50, 20, 2)}, baseline, 0.2, scale=2.0) == []
+    assert len(find_regressions({"game.py": make_result(50, 20, 2)}, baseline, 0.2)) == 3
+
+
+def test_detector_timings_are_left_out_for_another_mediapipe():
+    baseline = {"game.py": make_result(100, 10, 1)}
+    regressions = find_regressions({"game.py": make_result(20, 50, 2)}, baseline, 0.2, compare_detector=False)
+    assert regressions == ["game.py: hud p95 2.00 ms > baseline 1.00 ms"]
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from frame_ring import FrameRing
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_frames_keep_their_capture_time_until_the_slot_is_reused():
+    ring = FrameRing.for_shape((4, 6, 3), slots=2)
+    try:
+        first = ring.write(np.full((4, 6, 3), 1, dtype=np.uint8), 0.25)
+        frame, timestamp = ring.read(first)
+        assert frame.shape == (4, 6, 3) and (frame == 1).all() and timestamp == 0.25
+        ring.write(np.full((4, 6, 3), 2, dtype=np.uint8), 0.5)
+        ring.write(np.full((2, 3), 3, dtype=np.uint8), 0.75)  # Same slot as the first frame
+        assert ring.read(first) == (None, None)
+        frame, timestamp = ring.read(first + 2)
+        assert frame.shape == (2, 3) and (frame == 3).all() and timestamp == 0.75
+    finally:
+        ring.close()
+
+
+# A process that attaches and exits leaves the block to its owner
+def test_attached_process_exit_keeps_the_block():
+    ring = FrameRing.for_shape((2, 2, 3))
+    try:
+        seq = ring.write(np.full((2, 2, 3), 9, dtype=np.uint8), 1.5)
+        code = (f"from frame_ring import FrameRing; ring = FrameRing({ring.name!r}); "
+                f"frame, timestamp = ring.read({seq}); print(int(frame[0, 0, 0]), timestamp); ring.close()")
+        child = subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True, timeout=60)
+        assert child.returncode == 0 and child.stdout.split() == ["9", "1.5"]
+        assert "leaked" not in child.stderr
+        attached = FrameRing(ring.name)
+        frame, _ = attached.read(seq)
+        assert (frame == 9).all()
+        del frame
+        attached.close()
+    finally:
+        ring.close()
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+import game_runtime
+from game_io import HeadlessDisplay, WindowDisplay
+from hand_engine import SystemClock
+from memory_sequence import MemorySequenceGame
+from replay import ReplayClock
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    scores = []
+    monkeypatch.setattr(game_runtime, "submit_score", lambda *args: scores.append(args))
+    return scores
+
+
+def make_game(display, clock):
+    game = game_runtime.GameRuntime(SimpleNamespace(recorder=None), display, clock)
+    game.name = "test_game"
+    return game
+
+
+def test_live_score_is_recorded(submitted):
+    make_game(WindowDisplay(), SystemClock()).record_score(12.5)
+    assert submitted == [("test_game", "default", 12.5, True, "seconds")]
+
+
+def test_windowed_replay_score_is_not_recorded(submitted):
+    make_game(WindowDisplay(), ReplayClock()).record_score(12.5)
+    assert submitted == []
+
+
+def test_headless_score_is_not_recorded(submitted):
+    clock = ReplayClock()
+    make_game(HeadlessDisplay(clock), clock).record_score(12.5)
+    assert submitted == []
+
+
+class FailingGame(game_runtime.GameRuntime):
+    name = "failing_game"
+    cleaned_up = 0
+
+    def update(self, hand_frame):
+        raise RuntimeError("update failed")
+
+    def cleanup(self):
+        self.cleaned_up += 1
+
+
+def test_cleanup_runs_when_the_game_fails():
+    clock = ReplayClock()
+    hand_frame = SimpleNamespace(frame=None, timestamp=0.0)
+    game = FailingGame(SimpleNamespace(recorder=None, read=lambda: hand_frame), HeadlessDisplay(clock), clock)
+    with pytest.raises(RuntimeError):
+        game.run()
+    assert game.cleaned_up == 1
+
+
+@pytest.mark.parametrize("round_number, scores", [(1, []), (3, [2])])
+def test_memory_sequence_scores_completed_rounds(submitted, round_number, scores):
+    game = MemorySequenceGame(SimpleNamespace(recorder=None), WindowDisplay(), SystemClock())
+    game.round_number = round_number
+    game.finish(None)
+    assert [args[2] for args in submitted] == scores
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from gestures import GestureEngine, HandGesture, HoldDetector, VoteWindow
+
+FPS = 8  # Frame times are exact in binary, so hold durations compare exactly
+
+
+def test_vote_window_counts_only_the_last_values():
+    votes = VoteWindow(3)
+    for value in (1, 1, 2, 2, 3):
+        votes.push(value)
+    assert (votes.count(1), votes.count(2), votes.count(3)) == (0, 2, 1)
+    votes.clear()
+    assert votes.count(2) == 0
+
+
+# Events of one hand going through the open (True) / closed (False) sequence
+def hand_events(sequence):
+    engine = GestureEngine()
+    events = []
+    for frame_idx, is_open in enumerate(sequence):
+        events += engine.update(SimpleNamespace(is_open=[is_open]), frame_idx / FPS)
+    return [event.kind for event in events]
+
+
+def test_flickering_close_fires_one_event():
+    assert hand_events([True, True, True, False, True, False, False, True, False, False, False]) == \
+        ["opened", "closed"]
+
+
+def test_single_misdetected_frames_fire_nothing():
+    assert hand_events([True, True, False, True, True, False, True, True]) == ["opened"]
+
+
+def test_close_before_the_hand_opened_does_not_count():
+    gesture = HandGesture()
+    assert [gesture.update(False, t) for t in range(3)] == [None, None, None]
+    assert gesture.state == "Closed"
+
+
+def test_held_value_fires_after_hold_time():
+    hold = HoldDetector(hold_time=1.0)
+    events = []
+    for frame_idx in range(19):
+        # One misdetected frame does not restart the hold
+        value = 3 if frame_idx == 6 else 2
+        event = hold.update(value, frame_idx / FPS)
+        if event is not None:
+            events.append((frame_idx, event.value, event.duration))
+    # The value is taken on the third frame (t = 0.25), then held for a second
+    assert events == [(10, 2, 1.0), (18, 2, 1.0)]
+
+
+def test_no_value_never_fires():
+    hold = HoldDetector(hold_time=0.5)
+    assert all(hold.update(None, frame_idx / FPS) is None for frame_idx in range(20))
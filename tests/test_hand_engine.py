@@ -0,0 +1,88 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import hand_engine
+from hand_engine import HandEngine
+
+
+class BlankSource:
+    def __init__(self):
+        self.released_while = None
+
+    def read(self):
+        time.sleep(0.01)
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def is_opened(self):
+        return True
+
+    def release(self):
+        self.released_while = threading.enumerate()
+
+
+class Recorder:
+    def __init__(self):
+        self.closed = False
+        self.written_after_close = 0
+
+    def write(self, hand_frame):
+        if self.closed:
+            self.written_after_close += 1
+
+    def close(self):
+        self.closed = True
+
+
+# Detector whose process() blocks until the gate is set or the delay has passed,
+# like the first model load
+class SlowDetector:
+    def __init__(self, delay, gate=None):
+        self.delay = delay
+        self.gate = gate or threading.Event()
+        self.started = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def process(self, frame_rgb):
+        self.started.set()
+        self.gate.wait(self.delay)
+        return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+
+
+def make_engine(detector):
+    return HandEngine(source=BlankSource(), recorder=Recorder(), detector_factory=lambda *args: detector)
+
+
+def test_stop_waits_for_a_slow_inference_step():
+    detector = SlowDetector(delay=1.5)
+    engine = make_engine(detector).start()
+    inference_thread = engine.inference_thread
+    assert detector.started.wait(5)
+    engine.stop()
+    assert not inference_thread.is_alive()
+    assert inference_thread not in engine.source.released_while
+    assert engine.recorder.closed
+    assert engine.recorder.written_after_close == 0
+
+
+def test_stop_leaves_the_recorder_open_while_inference_is_stuck(monkeypatch):
+    monkeypatch.setattr(hand_engine, "STOP_TIMEOUT", 1.2)
+    detector = SlowDetector(delay=30)
+    engine = make_engine(detector).start()
+    inference_thread = engine.inference_thread
+    assert detector.started.wait(5)
+    engine.stop()
+    assert inference_thread.is_alive()
+    assert not engine.recorder.closed
+    # The capture thread had stopped, so the source was released
+    assert engine.source.released_while is not None
+    detector.gate.set()
+    inference_thread.join(5)
+    assert not inference_thread.is_alive()
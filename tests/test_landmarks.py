@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from landmarks import classify_hands
+
+FRAME_WIDTH, FRAME_HEIGHT = 640, 480
+
+
+# Mediapipe-like results for hands given as lists of 21 (x, y, z) and their labels
+def make_results(hands, labels, scores=None):
+    if not hands:
+        return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+    scores = scores or [0.9] * len(hands)
+    return SimpleNamespace(
+        multi_hand_landmarks=[SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in hand])
+                              for hand in hands],
+        multi_handedness=[SimpleNamespace(classification=[SimpleNamespace(label=label, score=score)])
+                          for label, score in zip(labels, scores)],
+    )
+
+
+# 21 landmarks of a hand centred at x: fingers_up for index, middle, ring and
+# pinky, thumb_out when the thumb points away from the palm
+def make_hand(x=0.3, fingers_up=(True, True, True, True), thumb_out=True, label="Right"):
+    points = [(x, 0.8, 0.0)] + [None] * 20
+    # Thumb (1-4): a right hand's thumb points to the left of the image when it is out
+    direction = -1 if (label == "Right") == thumb_out else 1
+    for joint, landmark in enumerate(range(1, 5)):
+        points[landmark] = (x + direction * 0.03 * (joint + 1), 0.7 - 0.02 * joint, 0.0)
+    for finger, up in enumerate(fingers_up):
+        mcp = 5 + 4 * finger
+        finger_x = x - 0.04 + 0.03 * finger
+        ys = (0.6, 0.5, 0.4, 0.3) if up else (0.6, 0.55, 0.62, 0.66)
+        for joint, y in enumerate(ys):
+            points[mcp + joint] = (finger_x, y, -0.01 * joint)
+    return points
+
+
+# The per-hand logic the games used before the classifier was vectorized
+def reference_is_open(hand):
+    return int(hand[12][1] * FRAME_HEIGHT) < int(hand[9][1] * FRAME_HEIGHT)
+
+
+def reference_count_fingers(hand, label):
+    count = 0
+    for tip_idx in (8, 12, 16, 20):
+        if hand[tip_idx][1] < hand[tip_idx - 2][1]:
+            count += 1
+    if label == "Right":
+        if hand[4][0] < hand[3][0]:
+            count += 1
+    else:
+        if hand[4][0] > hand[3][0]:
+            count += 1
+    return count
+
+
+def reference_on_left(hand):
+    return int(hand[12][0] * FRAME_WIDTH) < FRAME_WIDTH // 2
+
+
+def assert_matches_reference(hands, labels):
+    hand_array = classify_hands(make_results(hands, labels))
+    assert hand_array.is_open.tolist() == [reference_is_open(hand) for hand in hands]
+    assert hand_array.finger_counts.tolist() == [reference_count_fingers(hand, label)
+                                                 for hand, label in zip(hands, labels)]
+    assert hand_array.on_left.tolist() == [reference_on_left(hand) for hand in hands]
+    assert hand_array.is_right.tolist() == [label == "Right" for label in labels]
+    return hand_array
+
+
+def test_zero_hands():
+    hand_array = classify_hands(make_results([], []))
+    assert hand_array.points.shape == (0, 21, 3)
+    for values in (hand_array.is_right, hand_array.scores, hand_array.is_open,
+                   hand_array.finger_counts, hand_array.on_left):
+        assert len(values) == 0
+
+
+@pytest.mark.parametrize("label", ["Right", "Left"])
+def test_open_and_closed_hand(label):
+    open_hand = make_hand(fingers_up=(True,) * 4, label=label)
+    fist = make_hand(x=0.7, fingers_up=(False,) * 4, thumb_out=False, label=label)
+    hand_array = assert_matches_reference([open_hand, fist], [label, label])
+    assert hand_array.is_open.tolist() == [True, False]
+    assert hand_array.finger_counts.tolist() == [5, 0]
+
+
+@pytest.mark.parametrize("label", ["Right", "Left"])
+@pytest.mark.parametrize("count", range(6))
+def test_each_finger_count(count, label):
+    # The thumb first, then index, middle, ring and pinky
+    raised = [finger < count for finger in range(5)]
+    hand = make_hand(fingers_up=tuple(raised[1:]), thumb_out=raised[0], label=label)
+    hand_array = assert_matches_reference([hand], [label])
+    assert hand_array.finger_counts.tolist() == [count]
+
+
+def test_thumb_direction_depends_on_handedness():
+    # The same points are a raised thumb for one hand and a folded one for the other
+    hand = make_hand(fingers_up=(False,) * 4, thumb_out=True, label="Right")
+    assert_matches_reference([hand, hand], ["Right", "Left"])
+    assert classify_hands(make_results([hand, hand], ["Right", "Left"])).finger_counts.tolist() == [1, 0]
+
+
+def test_left_and_right_side():
+    hands = [make_hand(x=0.2), make_hand(x=0.8), make_hand(x=0.45), make_hand(x=0.55)]
+    hand_array = assert_matches_reference(hands, ["Right", "Left", "Left", "Right"])
+    assert hand_array.on_left.tolist() == [True, False, True, False]
+
+
+def test_points_and_scores_are_kept():
+    hands = [make_hand(x=0.25, label="Left"), make_hand(x=0.75, fingers_up=(True, False, True, False))]
+    hand_array = classify_hands(make_results(hands, ["Left", "Right"], scores=[0.6, 0.95]))
+    np.testing.assert_allclose(hand_array.points, np.array(hands, dtype=np.float32))
+    np.testing.assert_allclose(hand_array.scores, [0.6, 0.95])
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import leaderboard
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def legacy_file(tmp_path, monkeypatch):
+    path = tmp_path / "hand_detection_leaderboard.txt"
+    monkeypatch.setitem(leaderboard.LEGACY_FILES, "hand_detection", str(path))
+    return path
+
+
+def test_legacy_file_is_imported_once_without_its_bad_lines(tmp_path, legacy_file):
+    legacy_file.write_text("26.88\n\n27.01\nnot a time\n28.9\x00\ninf\n28.91")
+    database = str(tmp_path / "leaderboard.db")
+    connection = leaderboard.connect(database)
+    assert leaderboard.top_scores(connection, "hand_detection") == ("seconds", [26.88, 27.01, 28.91])
+    connection.close()
+
+    # Opening the database again does not import the file a second time
+    connection = leaderboard.connect(database)
+    assert leaderboard.top_scores(connection, "hand_detection", k=10)[1] == [26.88, 27.01, 28.91]
+    connection.close()
+
+
+def test_writer_survives_a_failed_score(tmp_path, legacy_file, monkeypatch):
+    add_score = leaderboard.add_score
+    calls = []
+
+    def add_score_failing_once(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ValueError("bad score")
+        add_score(*args, **kwargs)
+
+    monkeypatch.setattr(leaderboard, "add_score", add_score_failing_once)
+    database = str(tmp_path / "leaderboard.db")
+    writer = leaderboard.LeaderboardWriter(database)
+    writer.start()
+    writer.submit("number_hands", "default", 12.0)
+    writer.submit("number_hands", "default", 11.0)
+    writer.close()
+    assert not writer.is_alive()
+    connection = leaderboard.connect(database)
+    assert leaderboard.top_scores(connection, "number_hands") == ("seconds", [11.0])
+    connection.close()
+
+
+# Two stations writing to the same database at the same time
+def test_two_writer_processes(tmp_path, legacy_file):
+    database = str(tmp_path / "leaderboard.db")
+    code = ("import sys, leaderboard; connection = leaderboard.connect(sys.argv[1]); "
+            "[leaderboard.add_score(connection, 'filling_bar', 'default', float(i), station=sys.argv[2]) "
+            "for i in range(200)]")
+    # Run in the temporary folder, where there is no old leaderboard to import
+    environment = dict(os.environ, PYTHONPATH=REPO)
+    writers = [subprocess.Popen([sys.executable, "-c", code, database, station], cwd=str(tmp_path),
+                                env=environment, stderr=subprocess.PIPE, text=True)
+               for station in ("station_a", "station_b")]
+    for process in writers:
+        _, errors = process.communicate(timeout=120)
+        assert process.returncode == 0, errors
+
+    connection = leaderboard.connect(database)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    counts = dict(connection.execute("SELECT station, COUNT(*) FROM scores GROUP BY station").fetchall())
+    assert counts == {"station_a": 200, "station_b": 200}
+    assert leaderboard.top_scores(connection, "filling_bar", k=3)[1] == [0.0, 0.0, 1.0]
+    connection.close()
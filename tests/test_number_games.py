@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from game_io import HeadlessDisplay
+from number_fingers import NumberFingersGame
+from number_hands import NumberHandsGame
+from replay import ReplayClock
+
+FPS = 15
+
+
+class EventRecorder:
+    def __init__(self):
+        self.events = []
+
+    def event(self, kind, timestamp, data):
+        self.events.append((kind, data))
+
+    def responses(self):
+        return [data for kind, data in self.events if kind == "response"]
+
+
+def make_game(game_class):
+    clock = ReplayClock()
+    recorder = EventRecorder()
+    game = game_class(SimpleNamespace(recorder=recorder), HeadlessDisplay(clock), clock)
+    game.start()
+    game.first_frame_time = 0.0
+    return game, recorder
+
+
+# seconds of frames with this many hands, each raising fingers_per_hand fingers
+def play(game, start, seconds, hand_count, fingers_per_hand=0):
+    for frame_idx in range(int(seconds * FPS)):
+        timestamp = start + frame_idx / FPS
+        hands = SimpleNamespace(points=np.zeros((hand_count, 21, 3), dtype=np.float32),
+                                finger_counts=np.full(hand_count, fingers_per_hand))
+        results = SimpleNamespace(multi_hand_landmarks=[None] * hand_count or None)
+        game.frame_time = timestamp
+        game.update(SimpleNamespace(frame=np.zeros((480, 640, 3), dtype=np.uint8), results=results,
+                                    timestamp=timestamp, hands=hands))
+    return start + seconds
+
+
+@pytest.mark.parametrize("game_class", [NumberFingersGame, NumberHandsGame])
+def test_no_hands_in_view_is_no_answer(game_class):
+    game, recorder = make_game(game_class)
+    play(game, 0.0, 7, hand_count=0)
+    assert recorder.responses() == []
+
+
+def test_hands_without_fingers_are_no_answer():
+    game, recorder = make_game(NumberFingersGame)
+    play(game, 0.0, 7, hand_count=2, fingers_per_hand=0)
+    assert recorder.responses() == []
+
+
+@pytest.mark.parametrize("game_class", [NumberFingersGame, NumberHandsGame])
+def test_wrong_answer_held_is_recorded_once(game_class):
+    game, recorder = make_game(game_class)
+    game.current_number = 4
+    play(game, 0.0, 7, hand_count=3, fingers_per_hand=1)
+    assert recorder.responses() == [{"correct": False, "value": 3, "duration": pytest.approx(2, abs=0.1)}]
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from session_file import CHUNK_HEADER, SCALE, SessionReader, SessionRecorder
+
+FRAMES = 50
+CHUNK_FRAMES = 16
+
+
+# Frames with 0, 1 and 2 hands in turn, 30 fps from timestamp 1000
+def make_frames(count=FRAMES):
+    rng = np.random.default_rng(7)
+    frames = []
+    for frame_idx in range(count):
+        hands = frame_idx % 3
+        frames.append(SimpleNamespace(
+            frame=np.zeros((48, 64, 3), dtype=np.uint8),
+            timestamp=1000.0 + frame_idx / 30,
+            hands=SimpleNamespace(
+                points=rng.uniform(0.1, 0.9, (hands, 21, 3)).astype(np.float32),
+                is_right=np.arange(hands) % 2 == 0,
+                scores=rng.uniform(0.5, 1.0, hands).astype(np.float32),
+            ),
+        ))
+    return frames
+
+
+def record(path, frames, close=True):
+    recorder = SessionRecorder(str(path), chunk_frames=CHUNK_FRAMES)
+    for frame_idx, hand_frame in enumerate(frames):
+        recorder.write(hand_frame)
+        if frame_idx == 20:
+            recorder.event("score", hand_frame.timestamp, {"points": 3})
+    if close:
+        recorder.close()
+    return recorder
+
+
+def check_frame(reader, frames, frame_idx):
+    expected = frames[frame_idx]
+    timestamp, points, is_right, scores = reader.frame(frame_idx)
+    assert timestamp == pytest.approx(expected.timestamp, abs=1e-6)
+    np.testing.assert_allclose(points, expected.hands.points, atol=2 / SCALE)
+    np.testing.assert_array_equal(is_right, expected.hands.is_right)
+    np.testing.assert_allclose(scores, expected.hands.scores, atol=1 / 255)
+
+
+def test_round_trip(tmp_path):
+    frames = make_frames()
+    record(tmp_path / "session.hsr", frames)
+    reader = SessionReader(str(tmp_path / "session.hsr"))
+    assert len(reader) == FRAMES
+    assert (reader.height, reader.width) == (48, 64)
+    np.testing.assert_array_equal(reader.hand_counts(), [frame_idx % 3 for frame_idx in range(FRAMES)])
+    np.testing.assert_allclose(reader.timestamps(), [frame.timestamp for frame in frames], atol=1e-6)
+    for frame_idx in range(FRAMES):
+        check_frame(reader, frames, frame_idx)
+    assert reader.events() == [(20, pytest.approx(frames[20].timestamp), "score", {"points": 3})]
+    reader.close()
+
+
+def test_index_lookups(tmp_path):
+    frames = make_frames()
+    record(tmp_path / "session.hsr", frames)
+    reader = SessionReader(str(tmp_path / "session.hsr"))
+    assert reader.chunk_count == 4
+    assert [chunk.first_frame for chunk in reader.chunks()] == [0, 16, 32, 48]
+    # Frames on both sides of each chunk boundary, read in any order
+    for frame_idx in (49, 0, 15, 16, 31, 32, 47, 48):
+        check_frame(reader, frames, frame_idx)
+    reader.close()
+
+
+# A game that crashed leaves no index and maybe half a chunk; the whole chunks
+# before it are still read
+@pytest.mark.parametrize("extra", [0, CHUNK_HEADER.size // 2, CHUNK_HEADER.size + 8])
+def test_truncated_file(tmp_path, extra):
+    frames = make_frames()
+    recorder = record(tmp_path / "session.hsr", frames)
+    last_chunk_offset = recorder.index[-1][1]
+    data = (tmp_path / "session.hsr").read_bytes()
+    (tmp_path / "crashed.hsr").write_bytes(data[:last_chunk_offset + extra])
+
+    reader = SessionReader(str(tmp_path / "crashed.hsr"))
+    assert reader.chunk_count == 3
+    assert len(reader) == 48
+    for frame_idx in (0, 20, 47):
+        check_frame(reader, frames, frame_idx)
+    assert [event[2] for event in reader.events()] == ["score"]
+    reader.close()
+
+
+def test_file_left_open_by_a_crash(tmp_path):
+    frames = make_frames(40)
+    recorder = record(tmp_path / "session.hsr", frames, close=False)
+    # Only the two full chunks were flushed
+    reader = SessionReader(str(tmp_path / "session.hsr"))
+    assert len(reader) == 32
+    check_frame(reader, frames, 31)
+    reader.close()
+    recorder.file.close()
@@ -0,0 +1,59 @@
+import sys
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from telemetry import SessionTelemetry
+
+
+# Engine threads keep reporting stages while the game thread starts and ends sessions
+def test_stages_reported_while_sessions_begin_and_end(tmp_path):
+    telemetry = SessionTelemetry(str(tmp_path), flush_interval=0.0)
+    errors = []
+    stop = threading.Event()
+
+    def engine_thread():
+        try:
+            while not stop.is_set():
+                telemetry.add("inference", 0.004)
+                telemetry.dropped(1)
+        except Exception as error:
+            errors.append(error)
+
+    # Switch threads as often as possible, to hit any gap between a check and its use
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=engine_thread) for _ in range(3)]
+    try:
+        for thread in threads:
+            thread.start()
+        hand_frame = SimpleNamespace(hands=SimpleNamespace(points=np.zeros((1, 21, 3))))
+        for session in range(200):
+            telemetry.begin(f"game_{session % 3}")
+            telemetry.frame(hand_frame)
+            telemetry.end()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        sys.setswitchinterval(switch_interval)
+    telemetry.close()
+
+    assert errors == []
+    assert sum(stats.sessions for stats in telemetry.games.values()) == 200
+    for stats in telemetry.games.values():
+        histogram = stats.stages.get("inference")
+        if histogram is not None:
+            assert histogram.count == round(histogram.total / 4)
+
+
+def test_session_is_written(tmp_path):
+    telemetry = SessionTelemetry(str(tmp_path))
+    telemetry.begin("hand_detection")
+    telemetry.add("inference", 0.012)
+    telemetry.end()
+    assert '"game": "hand_detection"' in (tmp_path / "telemetry.jsonl").read_text()
+    prometheus = next(tmp_path.glob("*.prom")).read_text()
+    assert 'hand_games_stage_latency_ms_count{instance=' in prometheus
+    assert 'stage="inference"} 1' in prometheus